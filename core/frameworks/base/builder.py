@@ -1,9 +1,20 @@
 
+import threading
+
 from abc            import ABC, abstractmethod
-from core.utils     import SimpleLogger, Utils
+from core.utils     import ArtifactStore, AsyncWriter, ModelPool, SimpleLogger, Utils
 
 class BaseBuilder(ABC):
-    cache = {}
+    # named artifacts ('audio-<name>', ...), spilled to disk over 'cache-memory-budget-mb'
+    cache = ArtifactStore()
+
+    # background writer of output files, flushed at the end of each pipeline
+    writer              = AsyncWriter()
+
+    # transcription models shared by all builders, keyed by (model, device, precision)
+    whisper_models      = ModelPool("whisper", memory_budget_mb=4096)
+    whisper_settings    = {}
+    whisper_lock        = threading.Lock()
     
     def __init__(self):
         self.logger         = SimpleLogger.get_logger()
@@ -18,6 +29,39 @@ class BaseBuilder(ABC):
         """Save data to cache or to a given file."""
         pass
 
+    # load whisper defaults (shared by all builders):
+    # - 'whisper-model', 'whisper-device' and 'whisper-precision' used when an action does not set them
+    # - 'whisper-memory-budget-mb' limits the memory of the resident transcription models
+    @staticmethod
+    def load_whisper_defaults(defaults):
+        keys = ("whisper-model", "whisper-device", "whisper-precision")
+
+        BaseBuilder.whisper_settings = {key: defaults[key] for key in keys if key in defaults}
+        BaseBuilder.whisper_models.configure(memory_budget_mb=defaults.get("whisper-memory-budget-mb"))
+
+    def get_whisper_setting(self, action, key, default=None):
+        return action.get(key, BaseBuilder.whisper_settings.get(key, default))
+
+    # Transcribes audio with a pooled whisper model:
+    # - the model is loaded once per (model, device, precision) and kept resident
+    # - calls on the same pool are serialized, whisper models are not safe for concurrent decoding
+    def transcribe(self, audio, action, **kwargs):
+        import torch
+        import whisper
+
+        model_name          = self.get_whisper_setting(action, "whisper-model", "base")
+        device              = self.get_whisper_setting(action, "whisper-device", "cuda" if torch.cuda.is_available() else "cpu")
+        precision           = self.get_whisper_setting(action, "whisper-precision", "fp16" if device == "cuda" else "fp32")
+
+        model = BaseBuilder.whisper_models.get(
+            (model_name, device, precision),
+            lambda: whisper.load_model(model_name, device=device)
+        )
+
+        self.logger.info(f"[BaseBuilder] Transcribing with whisper: model={model_name}, device={device}, precision={precision}")
+        with BaseBuilder.whisper_lock:
+            return model.transcribe(audio, fp16=(precision == "fp16"), **kwargs)
+
     def load_text(self, source_path: str) -> str:
         try:
             self.logger.info(f"[BaseBuilder] Loading text from: {source_path}")
@@ -59,12 +103,10 @@ class BaseBuilder(ABC):
         try:
             self.logger.info(f"[BaseBuilder] Loading {data_type.upper()} from cache as '{name_key}'")
 
-            cache = self.__class__.cache
-            if name_key in self.__class__.cache:
-                return self.__class__.cache[name_key]
-            else:
+            content = BaseBuilder.cache.get(name_key)
+            if content is None:
                 self.logger.warning(f"[BaseBuilder] Cache key '{name_key}' not found.")
-                return None
+            return content
         except Exception as e:
             self.logger.error(f"[BaseBuilder] Error while loading {data_type.upper()} from cache as '{name_key}': {e}")
             return None
@@ -75,7 +117,6 @@ class BaseBuilder(ABC):
         try:
             self.logger.info(f"[BaseBuilder] Saving {data_type.upper()} to cache as '{name_key}'")
 
-            cache = self.__class__.cache
-            cache[name_key] = content
+            BaseBuilder.cache[name_key] = content
         except Exception as e:
             self.logger.error(f"[BaseBuilder] Error while saving {data_type.upper()} to cache as '{name_key}': {e}")
@@ -1,9 +1,11 @@
 
-from abc            import ABC
-from core.utils     import SimpleLogger
+from abc                    import ABC
+from core.frameworks.base   import BaseBuilder
+from core.utils             import ActionIO, SimpleLogger
 
 class BaseHandler(ABC):
     cache = {}
+    manifest = None
 
     def __init__(self):
         self.logger = SimpleLogger.get_logger()
@@ -13,12 +15,21 @@ class BaseHandler(ABC):
     def load_defaults(self, defaults):
         pass
 
-    def run(self, activity):
+    def plan(self, actions):
+        """Returns the actions to execute; handlers may override it to group actions (e.g. batches)."""
+        return actions
+
+    def run(self, activity, scheduler=None):
         self.logger.debug(f"[BaseHandler][{self.__class__.__name__}] Running activity: {activity.get('name', 'Unnamed')}")
         self.defaults = activity.get("defaults", {})
         self.load_defaults(self.defaults)
 
-        for action in activity.get("actions", []):
+        actions = self.plan(activity.get("actions", []))
+        if scheduler:
+            scheduler.run(self, actions)
+            return
+
+        for action in actions:
             self.handle(action)
 
     def handle(self, action):
@@ -34,8 +45,45 @@ class BaseHandler(ABC):
 
         func = self.commands.get(command)
         if func:
+            # input files may still be written in the background by a previous action
+            BaseBuilder.writer.wait(ActionIO.input_paths(action))
+
+            fingerprint = self.fingerprint(action)
+            if fingerprint and self.restore(action, fingerprint):
+                self.logger.info(f"[BaseHandler][{self.__class__.__name__}] Skipping up-to-date command: {command}")
+                return
+
+            state = self.output_state(action) if fingerprint else None
+            errors = self.logger.error_count
+
             self.logger.debug(f"[BaseHandler][{self.__class__.__name__}] Executing command: {command}")
             func(action)
+
+            # commands log their errors instead of raising them: failed commands are not recorded
+            if fingerprint and self.logger.error_count == errors:
+                self.record(action, fingerprint, state)
         else:
             self.logger.error(f"[BaseHandler]Unknown command: {command}")
 
+    # Incremental builds (enabled when a build manifest is set):
+    # - fingerprint hashes the action, its input files and the handler defaults
+    # - restore reloads the named cache entries of an unchanged action
+    # - output_state snapshots the output files, so record only keeps files the action rewrote
+    # - record stores the result of a successful action for the next run
+    def fingerprint(self, action):
+        if not BaseHandler.manifest:
+            return None
+
+        return BaseHandler.manifest.fingerprint(self.__class__.__name__, action, self.defaults)
+
+    def restore(self, action, fingerprint):
+        return BaseHandler.manifest.restore(self.__class__.__name__, action, fingerprint, BaseBuilder.cache)
+
+    def output_state(self, action):
+        BaseBuilder.writer.wait(ActionIO.output_paths(action))
+        return BaseHandler.manifest.output_state(action)
+
+    def record(self, action, fingerprint, state):
+        BaseBuilder.writer.wait(ActionIO.output_paths(action))
+        BaseHandler.manifest.record(self.__class__.__name__, action, fingerprint, BaseBuilder.cache, state)
+
@@ -1,10 +1,12 @@
 
+import os
 import pysrt
-import whisper
+import tempfile
 
 from core.frameworks.base   import BaseBuilder
+from core.frameworks.moviepy.ffmpeg import FFmpeg
 from core.utils             import Utils
-from moviepy                import AudioFileClip, concatenate_videoclips, ColorClip, CompositeVideoClip, ImageClip, VideoFileClip, TextClip
+from moviepy                import AudioClip, AudioFileClip, concatenate_videoclips, ColorClip, CompositeVideoClip, ImageClip, VideoFileClip, TextClip
 from PIL                    import ImageColor
 
 class MoviePyBuilder(BaseBuilder):
@@ -14,6 +16,8 @@ class MoviePyBuilder(BaseBuilder):
         self.fps            = 50
         self.video          = None
         self.overlays       = []
+        # set when the output file was written while building (ffmpeg fast paths)
+        self.written        = False
 
     def load_audio(self, source_path):
         try:
@@ -51,6 +55,44 @@ class MoviePyBuilder(BaseBuilder):
         except Exception as e:
             self.logger.error(f"[MoviePyBuilder] Error while saving image: {e}")
 
+    # Wraps a cached audio (pydub AudioSegment) as an audio clip:
+    # - frames are read from an integer view over the PCM buffer (no copy, no re-encoding)
+    # - only the requested samples are converted to floats
+    def load_cached_audio(self, audio_name):
+        import numpy as np
+
+        segment = self.load_from_cache("audio", audio_name)
+        if segment is None:
+            return None
+
+        if segment.sample_width == 3:
+            segment = segment.set_sample_width(4)
+
+        dtype       = {1: np.int8, 2: np.int16, 4: np.int32}[segment.sample_width]
+        samples     = np.frombuffer(segment.raw_data, dtype=dtype).reshape(-1, segment.channels)
+        scale       = float(1 << (8 * segment.sample_width - 1))
+        fps         = segment.frame_rate
+        duration    = len(samples) / fps
+
+        def frame_function(t):
+            idx = np.clip((np.asarray(t) * fps).astype(np.int64), 0, max(0, len(samples) - 1))
+            return samples[idx] / scale
+
+        return AudioClip(frame_function, duration=duration, fps=fps)
+
+    # Wraps a cached image (PIL Image) as an image clip, from its pixel array
+    def load_cached_image(self, image_name):
+        import numpy as np
+
+        image = self.load_from_cache("image", image_name)
+        if image is None:
+            return None
+
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGB")
+
+        return ImageClip(np.asarray(image))
+
     def load_video(self, source_path):
         try:
             self.logger.info(f"[MoviePyBuilder] Loading video from: {source_path}")
@@ -91,30 +133,147 @@ class MoviePyBuilder(BaseBuilder):
         if not (output_video_path or video_name):
             self.logger.error("[MoviePyBuilder] No save target specified (file or cache).")
             
-        if output_video_path:
+        if output_video_path and not self.written:
             self.save_video(self.video, output_video_path)
 
         if video_name:
             self.save_to_cache("video", video_name, self.video)
         return self
 
+    # Still-image fast path, used when an image and an audio produce 'output-video-path':
+    # - disabled with 'still-image': false
+    def use_still_image(self, action):
+        has_image = action.get("input-image-path") or action.get("image-name")
+        has_audio = action.get("input-audio-path") or action.get("audio-name")
+
+        return bool(action.get("still-image", True) and action.get("output-video-path") and has_image and has_audio)
+
+    # Encodes the video directly with ffmpeg (no frame rendered in Python):
+    # - the image is read once at 1 fps and repeated at 'fps' with still-image tuning, the audio is muxed as is
+    # - cached images are streamed as a raw RGB frame and cached audio as raw PCM, so nothing but the output touches the disk
+    # - the result is loaded into the cache when 'video-name' is set
+    def generate_still_video(self, action) -> 'MoviePyBuilder':
+        input_image_path    = action.get("input-image-path")
+        input_audio_path    = action.get("input-audio-path")
+        image_name          = action.get("image-name")
+        audio_name          = action.get("audio-name")
+        output_video_path   = action.get("output-video-path")
+        video_name          = action.get("video-name")
+
+        image = input_image_path
+        if not image:
+            image = self.load_from_cache("image", image_name)
+            if image is None:
+                raise ValueError(f"image '{image_name}' not found in cache")
+
+        audio = input_audio_path
+        if not audio:
+            segment = self.load_from_cache("audio", audio_name)
+            if segment is None:
+                raise ValueError(f"audio '{audio_name}' not found in cache")
+
+            audio = (segment.raw_data, segment.frame_rate, segment.channels, segment.sample_width)
+
+        self.logger.info(f"[MoviePyBuilder] Encoding still-image video with ffmpeg: {output_video_path}")
+        FFmpeg().still_image_video(image, audio, output_video_path, self.fps, self.codec)
+
+        self.written = True
+        if video_name:
+            self.video = self.load_video(output_video_path)
+
+        return self
+
     def generate_video(self, action) -> 'MoviePyBuilder':
-        """Generate a video by combining provided image and audio."""
+        """Generate a video by combining provided image and audio (files, or 'image-name'/'audio-name' from cache)."""
         input_image_path    = action.get("input-image-path")
         input_audio_path    = action.get("input-audio-path")
+        image_name          = action.get("image-name")
+        audio_name          = action.get("audio-name")
 
-        image = self.load_image(input_image_path)
-        audio = self.load_audio(input_audio_path)
+        if self.use_still_image(action):
+            try:
+                return self.generate_still_video(action)
+            except Exception as e:
+                self.logger.warning(f"[MoviePyBuilder] Still-image fast path failed, rendering with moviepy: {e}")
+
+        image = self.load_image(input_image_path) if input_image_path else self.load_cached_image(image_name)
+        audio = self.load_audio(input_audio_path) if input_audio_path else self.load_cached_audio(audio_name)
+
+        if image is None or audio is None:
+            self.logger.error("[MoviePyBuilder] Cannot generate video: missing image or audio.")
+            return self
         
         image = image.with_fps(self.fps).with_duration(audio.duration)
         self.video = image.with_audio(audio).with_duration(audio.duration)
             
         return self
 
+    # Returns the files backing the clips to merge, or None when a clip is not an unmodified video file:
+    # - a cached clip may have been trimmed or retimed after loading, so its duration must match the file
+    def get_clip_files(self, ffmpeg, clips, probes):
+        files = []
+
+        for clip in clips:
+            filename = getattr(clip, "filename", None)
+            if type(clip).__name__ != "VideoFileClip" or not filename or not os.path.isfile(filename):
+                return None
+
+            if filename not in probes:
+                probes[filename] = ffmpeg.probe(filename)
+            if abs(clip.duration - probes[filename]["duration"]) > 0.1:
+                return None
+
+            files.append(filename)
+
+        return files
+
+    # Stream-copy merge with ffmpeg ('stream-copy', default true):
+    # - inputs must all be video files; their streams are probed
+    # - inputs matching the most common stream parameters are copied as is
+    # - only mismatched inputs are re-encoded (to temporary files) to those parameters
+    # - the result is loaded into the cache when 'video-name' is set
+    def merge_videos_copy(self, action, clips) -> bool:
+        output_video_path   = action.get("output-video-path")
+        video_name          = action.get("video-name")
+
+        ffmpeg = FFmpeg()
+        probes = {}
+
+        files = self.get_clip_files(ffmpeg, clips, probes)
+        if files is None:
+            self.logger.info("[MoviePyBuilder] Some clips are not plain video files, merging with moviepy.")
+            return False
+
+        signatures = [(probes[path]["video"], probes[path]["audio"]) for path in files]
+        target_signature = max(signatures, key=signatures.count)
+        target = {"video": target_signature[0], "audio": target_signature[1]}
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            parts = []
+            for idx, (path, signature) in enumerate(zip(files, signatures)):
+                if signature == target_signature:
+                    parts.append(path)
+                    continue
+
+                self.logger.info(f"[MoviePyBuilder] Normalizing mismatched clip: {path}")
+                normalized_path = os.path.join(temp_dir, f"part{idx}{os.path.splitext(output_video_path)[1]}")
+                ffmpeg.normalize(path, target, normalized_path)
+                parts.append(normalized_path)
+
+            self.logger.info(f"[MoviePyBuilder] Joining {len(parts)} clips by stream copy: {output_video_path}")
+            ffmpeg.concat_copy(parts, output_video_path, temp_dir)
+
+        self.written = True
+        if video_name:
+            self.video = self.load_video(output_video_path)
+
+        return True
+
     def merge_videos(self, action) -> 'MoviePyBuilder':
         """Merge video clips from file paths or cache keys into one video."""
         video_paths         = action.get("input-video-paths")
         video_names         = action.get("video-names")
+        output_video_path   = action.get("output-video-path")
 
         clips = []
 
@@ -136,19 +295,40 @@ class MoviePyBuilder(BaseBuilder):
             self.logger.error("[TTSBuilder] No valid video clips found to merge.")
             return self
 
+        if output_video_path and action.get("stream-copy", True):
+            try:
+                if self.merge_videos_copy(action, clips):
+                    return self
+            except Exception as e:
+                self.logger.warning(f"[MoviePyBuilder] Stream-copy merge failed, merging with moviepy: {e}")
+
         self.video = concatenate_videoclips(clips, method="compose")
         return self
 
+    def get_whisper_samples(self, action):
+        """
+        Returns the audio track as the 16 kHz mono float32 samples whisper expects, without temporary files.
+        Videos loaded from a file are decoded straight from the container; other clips are sampled in memory.
+        """
+        import numpy as np
+        import whisper
+
+        input_video_path    = action.get("input-video-path")
+
+        if input_video_path:
+            return whisper.load_audio(input_video_path)
+
+        samples = self.video.audio.to_soundarray(fps=16000)
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1)
+        return samples.astype(np.float32)
+
     def generate_subtitles(self, action) -> 'MoviePyBuilder':
         """Use Whisper to transcribe embedded audio with phrase timestamps."""
         subtitle_output_path= action.get("output-text-path")
 
-        temp_file = subtitle_output_path+".wav"
-        self.save_audio(self.video.audio, temp_file)
-        
         # Use Whisper to generate subtitles
-        model = whisper.load_model("base")
-        result = model.transcribe(temp_file)
+        result = self.transcribe(self.get_whisper_samples(action), action)
 
         # This is the list of subtitles with timestamps
         subs = result['segments']
@@ -160,10 +340,7 @@ class MoviePyBuilder(BaseBuilder):
             end_time    = Utils.format_time(segment['end'])
             text = segment['text']
             subtitle_text += f"{i}\n{start_time} --> {end_time}\n{text}\n\n"
-        
-        #Delete temporary file
-        Utils.delete_file(temp_file)
-        #Now save the transcript
+
         self.save_text(subtitle_text, subtitle_output_path)
             
         return self
@@ -0,0 +1,200 @@
+
+import json
+import os
+import shutil
+import subprocess
+import threading
+
+from core.utils             import SimpleLogger, Utils
+
+class FFmpeg:
+    """Direct ffmpeg invocations for the cases where rendering frames through moviepy is not needed."""
+
+    # encoders re-creating the streams of a probed codec
+    VIDEO_ENCODERS      = {"h264": "libx264", "hevc": "libx265", "mpeg4": "mpeg4", "vp9": "libvpx-vp9"}
+    AUDIO_ENCODERS      = {"mp3": "libmp3lame", "aac": "aac", "opus": "libopus", "vorbis": "libvorbis"}
+
+    def __init__(self):
+        from moviepy.config import FFMPEG_BINARY
+
+        self.logger         = SimpleLogger.get_logger()
+        self.binary         = FFMPEG_BINARY
+        self.probe_binary   = FFmpeg.find_probe_binary(FFMPEG_BINARY)
+
+    @staticmethod
+    def find_probe_binary(binary):
+        """Returns the ffprobe next to the ffmpeg binary, or the one on the PATH."""
+        directory, name = os.path.split(binary)
+        candidate = os.path.join(directory, name.replace("ffmpeg", "ffprobe"))
+
+        if directory and os.path.isfile(candidate):
+            return candidate
+        return shutil.which("ffprobe") or shutil.which(candidate)
+
+    # Runs ffmpeg:
+    # - 'pipes' are (read fd, write fd, data) created by pipe_input; each data is written by its own thread
+    #   while ffmpeg reads, so several in-memory inputs can be given at once
+    def run(self, arguments, pipes=()):
+        command = [self.binary, "-y", "-hide_banner", "-loglevel", "error"] + arguments
+        self.logger.debug(f"[FFmpeg] {' '.join(command)}")
+
+        try:
+            process = subprocess.Popen(
+                command,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                pass_fds=[read_fd for read_fd, _, _ in pipes]
+            )
+        except Exception:
+            for read_fd, write_fd, _ in pipes:
+                os.close(read_fd)
+                os.close(write_fd)
+            raise
+
+        writers = []
+        for read_fd, write_fd, data in pipes:
+            os.close(read_fd)
+            writer = threading.Thread(target=FFmpeg.feed, args=(write_fd, data), daemon=True)
+            writer.start()
+            writers.append(writer)
+
+        _, stderr = process.communicate()
+        for writer in writers:
+            writer.join()
+
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed ({process.returncode}): {stderr.decode('utf-8', 'replace').strip()}")
+
+    @staticmethod
+    def pipe_input(pipes, data):
+        """Adds an in-memory input and returns its ffmpeg url."""
+        read_fd, write_fd = os.pipe()
+        pipes.append((read_fd, write_fd, data))
+        return f"pipe:{read_fd}"
+
+    @staticmethod
+    def feed(write_fd, data):
+        with open(write_fd, "wb") as pipe:
+            try:
+                pipe.write(data)
+            except BrokenPipeError:
+                # ffmpeg stopped reading (e.g. it failed), its error is reported by run
+                pass
+
+    # Encodes a still image over an audio track:
+    # - the image is read once at 1 frame per second and repeated up to 'fps' on output: the frame rate stays
+    #   the one of moviepy outputs (so videos can still be merged), while x264 still-image tuning encodes the
+    #   repeated frames at almost no cost
+    # - dimensions are rounded down to even values for yuv420p
+    # - image is a file path, or an RGB image (PIL) streamed as a raw frame
+    # - audio is a file path, or raw PCM given as (data, frame_rate, channels, sample_width)
+    # - the output is cut at the audio duration ('-shortest' overshoots by the frames buffered in the encoder)
+    def still_image_video(self, image, audio, output_path, fps, codec="libx264", audio_codec="libmp3lame"):
+        pipes = []
+        filters = ["scale=trunc(iw/2)*2:trunc(ih/2)*2"]
+
+        if isinstance(image, str):
+            arguments = ["-loop", "1", "-framerate", "1", "-i", image]
+        else:
+            image = image if image.mode == "RGB" else image.convert("RGB")
+            arguments = [
+                "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{image.width}x{image.height}", "-framerate", "1",
+                "-i", FFmpeg.pipe_input(pipes, image.tobytes())
+            ]
+            # a raw stream holds the frame once: repeat it
+            filters.insert(0, "loop=loop=-1:size=1:start=0")
+
+        if isinstance(audio, str):
+            from pydub.utils import mediainfo
+
+            arguments += ["-i", audio]
+            duration = float(mediainfo(audio)["duration"])
+        else:
+            data, frame_rate, channels, sample_width = audio
+            sample_format = {1: "s8", 2: "s16le", 3: "s24le", 4: "s32le"}[sample_width]
+            arguments += ["-f", sample_format, "-ar", str(frame_rate), "-ac", str(channels), "-i", FFmpeg.pipe_input(pipes, data)]
+            duration = len(data) / (frame_rate * channels * sample_width)
+
+        arguments += ["-map", "0:v:0", "-map", "1:a:0", "-c:v", codec]
+        if codec == "libx264":
+            arguments += ["-tune", "stillimage", "-preset", "medium"]
+
+        arguments += [
+            "-vf", ",".join(filters),
+            "-pix_fmt", "yuv420p",
+            "-r", str(fps),
+            "-c:a", audio_codec,
+            "-ar", "44100",
+            "-t", f"{duration:.6f}",
+            output_path
+        ]
+
+        Utils.ensure_dir(output_path)
+        self.run(arguments, pipes)
+
+    # Returns the stream parameters of a media file, used to decide whether files can be joined by stream copy:
+    # - video: codec, profile, size, pixel format, frame rate and time base
+    # - audio: codec, sample rate and channels (None without an audio stream)
+    def probe(self, path):
+        if not self.probe_binary:
+            raise RuntimeError("ffprobe not found")
+
+        command = [
+            self.probe_binary, "-v", "error",
+            "-show_entries", "stream=codec_type,codec_name,profile,width,height,pix_fmt,r_frame_rate,time_base,sample_rate,channels",
+            "-show_entries", "format=duration",
+            "-of", "json", path
+        ]
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        info = json.loads(result.stdout)
+
+        streams = info.get("streams", [])
+        video = next((s for s in streams if s.get("codec_type") == "video"), None)
+        audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+        if video is None:
+            raise ValueError(f"no video stream in {path}")
+
+        return {
+            "duration"  : float(info.get("format", {}).get("duration", 0.0)),
+            "video"     : tuple(video.get(k) for k in ("codec_name", "profile", "width", "height", "pix_fmt", "r_frame_rate", "time_base")),
+            "audio"     : tuple(audio.get(k) for k in ("codec_name", "sample_rate", "channels")) if audio else None
+        }
+
+    # Re-encodes a file to the given probed stream parameters (size, pixel format, frame rate, time base, audio format):
+    # - the picture is scaled to fit and padded, keeping its aspect ratio
+    def normalize(self, path, target, output_path):
+        codec, _, width, height, pix_fmt, frame_rate, time_base = target["video"]
+
+        if codec not in FFmpeg.VIDEO_ENCODERS:
+            raise ValueError(f"no encoder for video codec {codec}")
+
+        arguments = [
+            "-i", path,
+            "-map", "0:v:0",
+            "-vf", f"scale={width}:{height}:force_original_aspect_ratio=decrease,pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1",
+            "-r", frame_rate,
+            "-pix_fmt", pix_fmt,
+            "-c:v", FFmpeg.VIDEO_ENCODERS[codec],
+            "-video_track_timescale", time_base.split("/")[1]
+        ]
+
+        if target["audio"]:
+            audio_codec, sample_rate, channels = target["audio"]
+            if audio_codec not in FFmpeg.AUDIO_ENCODERS:
+                raise ValueError(f"no encoder for audio codec {audio_codec}")
+
+            arguments += ["-map", "0:a:0", "-c:a", FFmpeg.AUDIO_ENCODERS[audio_codec], "-ar", str(sample_rate), "-ac", str(channels)]
+
+        self.run(arguments + [output_path])
+
+    # Joins files with identical stream parameters with the concat demuxer, copying the streams
+    def concat_copy(self, paths, output_path, list_dir):
+        list_path = os.path.join(list_dir, "concat.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            for path in paths:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+
+        Utils.ensure_dir(output_path)
+        self.run(["-f", "concat", "-safe", "0", "-i", list_path, "-map", "0", "-c", "copy", output_path])
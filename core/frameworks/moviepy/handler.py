@@ -21,6 +21,8 @@ class MoviePyHandler(BaseHandler):
         self.codec          = defaults.get("codec", "libx264")
         self.fps            = defaults.get("fps", 60)
 
+        MoviePyBuilder.load_whisper_defaults(defaults)
+
         self.logger.info(f"[MoviePyHandler] Loaded defaults: codec={self.codec}, fps={self.fps}")
 
     def generate_video(self, action):
@@ -1,15 +1,34 @@
 
+import contextlib
+import math
+import random
+import threading
+
+from concurrent.futures     import ThreadPoolExecutor
 from core.frameworks.base   import BaseBuilder
-from core.utils             import Utils
+from core.frameworks.sdp.embeddings import PromptEmbeddingCache
+from core.frameworks.sdp.profile import PerformanceProfile
+from core.frameworks.sdp.tiling import TileBlender, TileLayout
+from core.utils             import ModelPool, Utils
 from PIL                    import Image, ImageColor, ImageDraw, ImageFont
 
 class SDPBuilder(BaseBuilder):
+    # loaded diffusion pipelines keyed by (model-path, dtype, device), one dict of pipelines per mode
+    pipelines           = ModelPool("diffusers", max_entries=1)
+    pipelines_lock      = threading.Lock()
+    # one lock per pipeline key, held while its pipelines run
+    pipeline_locks      = {}
+    defaults            = {}
+    profile             = None
+    prompt_embeddings   = PromptEmbeddingCache()
+
     def __init__(self):
         import torch
 
         super().__init__()
         self.image          = None
         self.pipeline       = None
+        self.quantization   = None
         self.device         = "cuda" if torch.cuda.is_available() else "cpu"
         self.torch_type     = torch.float16 if torch.cuda.is_available() else torch.float32
 
@@ -64,36 +83,185 @@ class SDPBuilder(BaseBuilder):
             self.save_to_cache("image", image_name, self.image)
         return self
 
-    def setup_text2image_pipeline(self, action) -> 'SDPBuilder':
-        from diffusers      import AutoPipelineForText2Image
+    # load defaults for SDPBuilder class:
+    # - stores activity defaults (e.g. 'model-path') used when an action does not set them
+    # - 'max-loaded-models' and 'memory-budget-mb' bound the pipeline cache
+    # - 'performance-profile' selects the inference tuning (see PerformanceProfile)
+    # - 'prompt-cache-size' and 'prompt-cache-dir' configure the prompt embedding cache
+    @staticmethod
+    def load_defaults(defaults):
+        SDPBuilder.defaults = defaults
+        SDPBuilder.pipelines.configure(
+            max_entries=defaults.get("max-loaded-models"),
+            memory_budget_mb=defaults.get("memory-budget-mb")
+        )
+
+        SDPBuilder.profile = PerformanceProfile(defaults.get("performance-profile"))
+        SDPBuilder.profile.apply_runtime()
+
+        SDPBuilder.prompt_embeddings.configure(
+            max_entries=defaults.get("prompt-cache-size"),
+            cache_dir=defaults.get("prompt-cache-dir")
+        )
+
+    def get_profile(self):
+        if SDPBuilder.profile is None:
+            SDPBuilder.profile = PerformanceProfile()
+        return SDPBuilder.profile
+
+    # Returns the quantizer of an action ('quantization' set on the action or in the activity defaults):
+    # - 'quantization-cache-dir' stores the quantized weights, 'quantization-benchmark' compares with fp32
+    def get_quantizer(self, action):
+        from core.frameworks.sdp.quantization import PipelineQuantizer
+
+        return PipelineQuantizer(
+            action.get("quantization", SDPBuilder.defaults.get("quantization")),
+            cache_dir=SDPBuilder.defaults.get("quantization-cache-dir", ".cache/quantized"),
+            benchmark=SDPBuilder.defaults.get("quantization-benchmark", False)
+        )
+
+    # Returns a cached diffusion pipeline for the given mode:
+    # - weights are loaded once per (model-path, dtype, device, profile, quantization) as a text2image pipeline
+    # - quantized components saved by a previous run are loaded instead of the fp32 ones
+    # - other modes are derived from the loaded components instead of reloading the weights
+    def get_pipeline(self, action, mode):
+        from diffusers      import AutoPipelineForImage2Image, AutoPipelineForText2Image
 
+        model_path          = self.get_model_path(action)
+        profile             = self.get_profile()
+        quantizer           = self.get_quantizer(action)
+        key                 = self.get_pipeline_key(action, quantizer)
+        quantized           = key[4] is not None
+
+        def load():
+            components = quantizer.load_cached(model_path) if quantized else {}
+            pipeline = AutoPipelineForText2Image.from_pretrained(
+                model_path,
+                torch_dtype=self.torch_type,
+                **components
+            ).to(self.device)
+
+            if quantized:
+                quantizer.apply(pipeline, model_path, cached=components)
+            return {"text2image": profile.apply(pipeline)}
+
+        pipelines = SDPBuilder.pipelines.get(key, load)
+        self.quantization = key[4]
+
+        with SDPBuilder.pipelines_lock:
+            if mode == "image2image" and mode not in pipelines:
+                pipelines[mode] = AutoPipelineForImage2Image.from_pipe(pipelines["text2image"])
+                self.logger.debug(f"[SDPBuilder] Derived Image2Image pipeline from loaded components: base={model_path}")
+
+        return pipelines[mode]
+
+    def get_pipeline_key(self, action, quantizer=None):
+        """Returns the key of the pipelines of an action: (model-path, dtype, device, profile, quantization)."""
+        quantizer = quantizer or self.get_quantizer(action)
+
+        return (
+            self.get_model_path(action),
+            str(self.torch_type),
+            self.device,
+            self.get_profile().key(),
+            quantizer.key() if quantizer.enabled(self.device) else None
+        )
+
+    # Returns the lock held while the pipelines of an action are set up and run:
+    # - text2image and image2image pipelines share their components (scheduler, VAE)
+    # - diffusers keeps per-call state in them (e.g. the scheduler step index), and VAE tiling is set per action,
+    #   so actions running in parallel threads take turns on the same pipelines
+    def pipeline_lock(self, action):
+        key = self.get_pipeline_key(action)
+
+        with SDPBuilder.pipelines_lock:
+            return SDPBuilder.pipeline_locks.setdefault(key, threading.RLock())
+
+    def setup_text2image_pipeline(self, action) -> 'SDPBuilder':
         model_path          = self.get_model_path(action)
 
-        self.pipeline = AutoPipelineForText2Image.from_pretrained(
-            model_path,
-            torch_dtype=self.torch_type
-        ).to(self.device)
+        self.pipeline = self.get_pipeline(action, "text2image")
 
         self.logger.info(f"[SDPBuilder] Text2Image pipeline: base={model_path}, device={self.device}")
         
         return self
 
     def setup_image2image_pipeline(self, action) -> 'SDPBuilder':
-        from diffusers      import AutoPipelineForImage2Image
-
         model_path          = self.get_model_path(action)
 
-        self.pipeline = AutoPipelineForImage2Image.from_pretrained(
-            model_path,
-            torch_dtype=self.torch_type
-        ).to(self.device)
+        self.pipeline = self.get_pipeline(action, "image2image")
 
         self.logger.info(f"[SDPBuilder] Image2Image pipeline: base={model_path}, device={self.device}")
 
         return self
 
+    # Returns the prompt arguments of a pipeline call:
+    # - cached precomputed embeddings when the pipeline supports them
+    # - the raw prompts otherwise
+    def get_prompt_arguments(self, action, prompts, negative_prompts):
+        profile             = self.get_profile()
+        context             = f"{self.torch_type}|{self.device}|{profile.key()}"
+
+        # a quantized text encoder produces different embeddings
+        if self.quantization:
+            context += f"|{self.quantization}"
+
+        # dynamically quantized layers only accept float32 activations
+        autocast = profile.autocast(self.device) if not self.is_dynamically_quantized() else contextlib.nullcontext()
+
+        with autocast:
+            embeddings = SDPBuilder.prompt_embeddings.embeddings(
+                self.pipeline,
+                self.get_model_path(action),
+                context,
+                prompts,
+                negative_prompts,
+                self.device
+            )
+
+        if embeddings:
+            return embeddings
+
+        if all(negative_prompt is None for negative_prompt in negative_prompts):
+            negative_prompts = None
+        else:
+            negative_prompts = [negative_prompt or "" for negative_prompt in negative_prompts]
+
+        return {
+            "prompt"            : prompts,
+            "negative_prompt"   : negative_prompts
+        }
+
+    def run_pipeline(self, **kwargs):
+        """Runs the current pipeline with the performance profile (autocast, per-step latency)."""
+        profile             = self.get_profile()
+        step_timer          = profile.step_timer()
+
+        # dynamically quantized layers only accept float32 activations
+        autocast = profile.autocast(self.device) if not self.is_dynamically_quantized() else contextlib.nullcontext()
+
+        with autocast:
+            result = self.pipeline(callback_on_step_end=step_timer, **kwargs)
+
+        self.logger.info(f"[SDPBuilder] Denoising with profile '{profile.name}': {step_timer.summary()}")
+        return result
+
+    def is_dynamically_quantized(self):
+        unet = getattr(self.pipeline, "unet", None)
+        return unet is not None and any("DynamicQuantized" in type(m).__name__ for m in unet.modules())
+
+    def unload_models(self, action) -> 'SDPBuilder':
+        """Evicts cached pipelines of the given 'model-path', or all of them."""
+        model_path          = action.get("model-path")
+
+        for key in SDPBuilder.pipelines.keys():
+            if model_path is None or key[0] == model_path:
+                SDPBuilder.pipelines.evict(key)
+
+        return self
+
     def get_model_path(self, action):
-        return action.get("model-path", "MykosX/delia-anime-sd")
+        return action.get("model-path", SDPBuilder.defaults.get("model-path", "MykosX/delia-anime-sd"))
 
     def get_width(self, action):
         return action.get("width", 512)
@@ -120,11 +288,69 @@ class SDPBuilder(BaseBuilder):
 
         if seed is None:
             seed = random.randint(0, 1 << 30)
-        return torch.manual_seed(seed)
+        # a dedicated generator per action keeps seeds reproducible in batches and parallel runs
+        return torch.Generator().manual_seed(seed)
 
     def get_inference_steps(self, action):
         return action.get("inference-steps", 50)
 
+    # Tiling settings (action, then activity defaults):
+    # - 'tiling': 'decode' decodes latents tile by tile, 'generation' also denoises tile by tile
+    # - 'tile-size' and 'tile-overlap' in pixels
+    def get_tiling(self, action):
+        return action.get("tiling", SDPBuilder.defaults.get("tiling"))
+
+    def get_tile_size(self, action):
+        tile_size = action.get("tile-size", SDPBuilder.defaults.get("tile-size", 512))
+        return max(64, (tile_size // 8) * 8)
+
+    def get_tile_overlap(self, action):
+        return action.get("tile-overlap", SDPBuilder.defaults.get("tile-overlap", 64))
+
+    def configure_vae_tiling(self, action):
+        """Enables tiled VAE decoding so decode memory does not grow with the output resolution."""
+        vae = self.pipeline.vae
+
+        if self.get_tiling(action) not in ("decode", "generation"):
+            # the VAE is shared by cached pipelines: restore the profile setting
+            if not self.get_profile().get("vae-tiling"):
+                vae.disable_tiling()
+            return
+
+        tile_size = self.get_tile_size(action)
+
+        vae.enable_tiling()
+        vae.tile_sample_min_size = tile_size
+        vae.tile_latent_min_size = tile_size // 8
+
+    # Tiled image to image:
+    # - the source image is resized to the target size and split in overlapping tiles
+    # - each tile is denoised separately, so peak memory depends on the tile size only
+    # - tiles are blended back with feathered overlaps
+    def generate_tiled(self, action, image, width, height, strength, prompt_arguments, **kwargs):
+        tile_size           = self.get_tile_size(action)
+        overlap             = self.get_tile_overlap(action)
+
+        self.setup_image2image_pipeline(action)
+        self.configure_vae_tiling(action)
+
+        image = image.convert("RGB").resize((width, height))
+        boxes = TileLayout.boxes(width, height, tile_size, overlap)
+        blender = TileBlender(width, height, overlap)
+
+        self.logger.info(f"[SDPBuilder] Tiled generation: {width}x{height} in {len(boxes)} tiles of {tile_size}px")
+
+        for box in boxes:
+            tile = self.run_pipeline(
+                **prompt_arguments,
+                image=image.crop(box),
+                strength=strength,
+                **kwargs
+            ).images[0]
+            blender.add(box, tile)
+
+        return blender.image()
+
     def adapt_size(self, width, height):
         """Adapts width and height to match multiples of 8 as Stable Diffusion expects"""
         new_width = (width // 8) * 8
@@ -142,22 +368,166 @@ class SDPBuilder(BaseBuilder):
         num_inference_steps = self.get_inference_steps(action)
         generator           = self.get_generator(action)
 
-        self.setup_text2image_pipeline(action)
-        
-        (width, height) = self.adapt_size(width, height)
-        
-        self.image = self.pipeline(
-            prompt=prompt,
-            negative_prompt=negative_prompt,
-            guidance_scale=guidance_scale,
-            num_inference_steps=num_inference_steps,
-            generator=generator,
-            width=width,
-            height=height
-        ).images[0]
+        with self.pipeline_lock(action):
+            self.setup_text2image_pipeline(action)
+            self.configure_vae_tiling(action)
+
+            (width, height) = self.adapt_size(width, height)
+            tile_size = self.get_tile_size(action)
+
+            if self.get_tiling(action) == "generation" and max(width, height) > tile_size:
+                # compose at tile resolution, then refine tile by tile at full resolution
+                scale = tile_size / max(width, height)
+                (base_width, base_height) = self.adapt_size(int(width * scale), int(height * scale))
+            else:
+                (base_width, base_height) = (width, height)
+
+            prompt_arguments = self.get_prompt_arguments(action, [prompt], [negative_prompt])
+
+            self.image = self.run_pipeline(
+                **prompt_arguments,
+                guidance_scale=guidance_scale,
+                num_inference_steps=num_inference_steps,
+                generator=generator,
+                width=base_width,
+                height=base_height
+            ).images[0]
+
+            if (base_width, base_height) != (width, height):
+                self.image = self.generate_tiled(
+                    action,
+                    self.image,
+                    width,
+                    height,
+                    self.get_strength(action),
+                    prompt_arguments,
+                    guidance_scale=guidance_scale,
+                    num_inference_steps=num_inference_steps,
+                    generator=generator
+                )
             
         return self
 
+    def get_batch_signature(self, action):
+        """Returns the settings text-to-image actions must share to be generated in one batch (generation settings first)."""
+        (width, height) = self.adapt_size(self.get_width(action), self.get_height(action))
+
+        return (
+            self.get_model_path(action),
+            width,
+            height,
+            self.get_inference_steps(action),
+            self.get_guidance_scale(action),
+            self.get_tiling(action),
+            self.get_tile_size(action),
+            self.get_quantizer(action).key()
+        )
+
+    def text_to_images(self, actions):
+        """
+        Generates the images of several text-to-image actions sharing a batch signature
+        in one batched denoising loop. Each action keeps its own seeded generator.
+        Returns the images in the order of the actions.
+        """
+        (model_path, width, height, num_inference_steps, guidance_scale) = self.get_batch_signature(actions[0])[:5]
+
+        prompts             = [self.get_prompt(action) for action in actions]
+        negative_prompts    = [self.get_negative_prompt(action) for action in actions]
+        generators          = [self.get_generator(action) for action in actions]
+
+        with self.pipeline_lock(actions[0]):
+            self.setup_text2image_pipeline(actions[0])
+            self.configure_vae_tiling(actions[0])
+
+            self.logger.info(f"[SDPBuilder] Generating {len(actions)} images in one batch ({width}x{height}, {num_inference_steps} steps)")
+
+            return self.run_pipeline(
+                **self.get_prompt_arguments(actions[0], prompts, negative_prompts),
+                guidance_scale=guidance_scale,
+                num_inference_steps=num_inference_steps,
+                generator=generators,
+                width=width,
+                height=height
+            ).images
+
+    def get_seeds(self, action):
+        """Returns the seeds of a variations action: 'seeds' list or 'seed-range' [start, stop)."""
+        seeds               = action.get("seeds")
+        seed_range          = action.get("seed-range")
+
+        if seeds:
+            return list(seeds)
+        if seed_range:
+            return list(range(*seed_range))
+        return [random.randint(0, 1 << 30) for _ in range(action.get("count", 4))]
+
+    def image_variations(self, action) -> 'SDPBuilder':
+        """
+        Generates one image per seed in a single pipeline session:
+        - the pipeline and the prompt embeddings are prepared once
+        - seeds are denoised in batches of 'batch-size', each with its own generator
+        - images are written by 'writer-threads' parallel threads to 'output-image-path',
+          a template accepting {seed} and {index}, while the next batch is generated
+        - optionally builds a contact sheet of all variants (current image)
+        """
+        output_image_path   = action.get("output-image-path")
+        batch_size          = action.get("batch-size", SDPBuilder.defaults.get("batch-size", 4))
+        writer_threads      = action.get("writer-threads", 4)
+        contact_sheet_path  = action.get("output-contact-sheet-path")
+        image_name          = action.get("image-name")
+
+        (model_path, width, height, num_inference_steps, guidance_scale) = self.get_batch_signature(action)[:5]
+
+        prompt              = self.get_prompt(action)
+        negative_prompt     = self.get_negative_prompt(action)
+        seeds               = self.get_seeds(action)
+
+        with self.pipeline_lock(action):
+            self.setup_text2image_pipeline(action)
+            self.configure_vae_tiling(action)
+
+            self.logger.info(f"[SDPBuilder] Generating {len(seeds)} variations in batches of {batch_size}")
+
+            images = []
+            with ThreadPoolExecutor(max_workers=writer_threads) as writer:
+                for start in range(0, len(seeds), batch_size):
+                    batch_seeds = seeds[start:start + batch_size]
+
+                    batch_images = self.run_pipeline(
+                        **self.get_prompt_arguments(action, [prompt] * len(batch_seeds), [negative_prompt] * len(batch_seeds)),
+                        guidance_scale=guidance_scale,
+                        num_inference_steps=num_inference_steps,
+                        generator=[self.get_generator({"seed": seed}) for seed in batch_seeds],
+                        width=width,
+                        height=height
+                    ).images
+
+                    for offset, (seed, image) in enumerate(zip(batch_seeds, batch_images)):
+                        if output_image_path:
+                            path = output_image_path.format(seed=seed, index=start + offset)
+                            writer.submit(self.save_image, image, path)
+                        images.append(image)
+
+        if contact_sheet_path or image_name:
+            self.image = self.make_contact_sheet(action, images)
+
+        return self
+
+    def make_contact_sheet(self, action, images):
+        """Arranges thumbnails of the given images in a grid."""
+        columns             = action.get("contact-sheet-columns", math.ceil(math.sqrt(len(images))))
+        thumb_width         = action.get("contact-sheet-width", 256)
+
+        thumb_height = round(images[0].height * thumb_width / images[0].width)
+        rows = math.ceil(len(images) / columns)
+
+        sheet = Image.new("RGB", (columns * thumb_width, rows * thumb_height), "white")
+        for idx, image in enumerate(images):
+            thumbnail = image.resize((thumb_width, thumb_height))
+            sheet.paste(thumbnail, ((idx % columns) * thumb_width, (idx // columns) * thumb_height))
+
+        return sheet
+
     def image_to_image(self, action) -> 'SDPBuilder':
         """Generate the image from current text and other settings."""
         prompt              = self.get_prompt(action)
@@ -169,25 +539,39 @@ class SDPBuilder(BaseBuilder):
         num_inference_steps = self.get_inference_steps(action)
         generator           = self.get_generator(action)
 
-        self.setup_image2image_pipeline(action)
-        
         builder = SDPBuilder().load(action, "seed-image-path", "seed-image-name")
-        
-        if builder.image:
-            (width, height) = self.adapt_size(width, height)
-            self.image = self.pipeline(
-                prompt=prompt,
-                negative_prompt=negative_prompt,
-                image=builder.image,
-                strength=strength,
-                guidance_scale=guidance_scale,
-                num_inference_steps=num_inference_steps,
-                generator=generator,
-                width=width,
-                height=height
-            ).images[0]
-        else:
-            self.logger.error("[SDPBuilder] Missing source image")
+
+        with self.pipeline_lock(action):
+            self.setup_image2image_pipeline(action)
+            self.configure_vae_tiling(action)
+
+            if builder.image and self.get_tiling(action) == "generation":
+                (width, height) = self.adapt_size(width, height)
+                self.image = self.generate_tiled(
+                    action,
+                    builder.image,
+                    width,
+                    height,
+                    strength,
+                    self.get_prompt_arguments(action, [prompt], [negative_prompt]),
+                    guidance_scale=guidance_scale,
+                    num_inference_steps=num_inference_steps,
+                    generator=generator
+                )
+            elif builder.image:
+                (width, height) = self.adapt_size(width, height)
+                self.image = self.run_pipeline(
+                    **self.get_prompt_arguments(action, [prompt], [negative_prompt]),
+                    image=builder.image,
+                    strength=strength,
+                    guidance_scale=guidance_scale,
+                    num_inference_steps=num_inference_steps,
+                    generator=generator,
+                    width=width,
+                    height=height
+                ).images[0]
+            else:
+                self.logger.error("[SDPBuilder] Missing source image")
             
         return self
 
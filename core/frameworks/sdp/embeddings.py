@@ -0,0 +1,108 @@
+
+import hashlib
+import inspect
+import json
+import os
+import threading
+
+from collections            import OrderedDict
+from core.utils             import SimpleLogger, Utils
+
+class PromptEmbeddingCache:
+    """
+    LRU cache of encoded prompt embeddings keyed by model, tokenizer and text.
+    Embeddings can optionally be persisted on disk so later runs skip the text encoder too.
+    """
+
+    def __init__(self, max_entries=64, cache_dir=None):
+        self.max_entries    = max_entries
+        self.cache_dir      = cache_dir
+        self.entries        = OrderedDict()
+        self.hits           = 0
+        self.misses         = 0
+        self._lock          = threading.Lock()
+
+    @property
+    def logger(self):
+        return SimpleLogger.get_logger()
+
+    def configure(self, max_entries=None, cache_dir=None):
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            self.cache_dir = cache_dir
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    @staticmethod
+    def supports(pipeline):
+        """Only pipelines taking a single 'prompt_embeds' tensor (Stable Diffusion 1.x/2.x) are supported."""
+        if not (hasattr(pipeline, "encode_prompt") and hasattr(pipeline, "tokenizer")):
+            return False
+
+        parameters = inspect.signature(pipeline.__call__).parameters
+        return "prompt_embeds" in parameters and "pooled_prompt_embeds" not in parameters
+
+    def disk_path(self, key):
+        digest = hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.pt")
+
+    # Returns the embedding of one text:
+    # - from memory, then from disk, and finally from the pipeline's text encoder
+    def encode(self, pipeline, key, text, device):
+        import torch
+
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+
+        embedding = None
+        if self.cache_dir and os.path.isfile(self.disk_path(key)):
+            try:
+                embedding = torch.load(self.disk_path(key), map_location=device)
+            except Exception as e:
+                self.logger.warning(f"[PromptEmbeddingCache] Ignoring unreadable embedding: {e}")
+
+        if embedding is None:
+            with torch.no_grad():
+                embedding, _ = pipeline.encode_prompt(text, device, 1, False)
+
+            if self.cache_dir:
+                path = self.disk_path(key)
+                Utils.ensure_dir(path)
+                torch.save(embedding.cpu(), path)
+
+        with self._lock:
+            self.misses += 1
+            self.entries[key] = embedding
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+        return embedding
+
+    # Returns the precomputed embeddings for a list of prompts and negative prompts:
+    # - missing negative prompts are encoded as empty text, like the pipelines do
+    # - returns None when the pipeline does not support precomputed embeddings
+    def embeddings(self, pipeline, model_path, context, prompts, negative_prompts, device):
+        import torch
+
+        if not PromptEmbeddingCache.supports(pipeline) or any(prompt is None for prompt in prompts):
+            return None
+
+        tokenizer = getattr(pipeline.tokenizer, "name_or_path", type(pipeline.tokenizer).__name__)
+
+        def encode(text):
+            return self.encode(pipeline, [model_path, tokenizer, context, text], text, device)
+
+        prompt_embeds           = torch.cat([encode(text) for text in prompts])
+        negative_prompt_embeds  = torch.cat([encode(text or "") for text in negative_prompts])
+
+        self.logger.debug(f"[PromptEmbeddingCache] hits={self.hits}, misses={self.misses}")
+
+        return {
+            "prompt_embeds"             : prompt_embeds,
+            "negative_prompt_embeds"    : negative_prompt_embeds
+        }
@@ -1,6 +1,7 @@
 
 from core.frameworks.base   import BaseHandler
 from core.frameworks.sdp    import SDPBuilder
+from core.utils             import ActionIO
 
 class SDPHandler(BaseHandler):
     def __init__(self):
@@ -8,7 +9,9 @@ class SDPHandler(BaseHandler):
 
         self.commands       = {
             "text-to-image"         : self.text_to_image,
+            "text-to-image-batch"   : self.text_to_image_batch,
             "image-to-image"        : self.image_to_image,
+            "image-variations"      : self.image_variations,
             "color-to-image"        : self.color_to_image,
             "resize-image"          : self.resize_image,
             #"crop-image"            : self.crop_image(image, x, y, w, h),
@@ -16,6 +19,7 @@ class SDPHandler(BaseHandler):
             #"flip-image"            : self.flip_image(image, direction), # horizontal/vertical
             #"overlay-image"         : self.overlay_image(image, overlay, x, y, alpha)
             "paste-image"           : self.paste_image,
+            "unload-models"         : self.unload_models,
             #"add-border"            : self.add_border(image, size, color),
             #"adjust-brightness"     : self.adjust_brightness(image, factor),
             #"adjust-contrast"       : self.adjust_contrast(image, factor),
@@ -34,6 +38,78 @@ class SDPHandler(BaseHandler):
             #"face-swap"             : face_swap(source_face, target_image),
         }
 
+    def load_defaults(self, defaults):
+        SDPBuilder.load_defaults(defaults)
+
+    # Groups text-to-image actions into batches when 'batch-size' (activity defaults) is above 1:
+    # - consecutive actions sharing model, size, steps, guidance, decode tiling and quantization are batched together
+    # - actions with tiled generation are never batched (they denoise tile by tile)
+    # - actions declaring the same 'batch-group' are batched together even when not consecutive,
+    #   unless an action in between reads or writes their files or cache entries
+    # - each batch becomes one 'text-to-image-batch' action holding the original actions
+    def plan(self, actions):
+        batch_size = self.defaults.get("batch-size", 1)
+        if batch_size <= 1:
+            return actions
+
+        sdp_builder = SDPBuilder()
+        planned     = []
+        groups      = {}
+        current     = None
+
+        for action in actions:
+            tiled = sdp_builder.get_tiling(action) == "generation"
+
+            if action.get("command") != "text-to-image" or not action.get("enabled", True) or tiled:
+                planned.append(action)
+                current = None
+                continue
+
+            signature = sdp_builder.get_batch_signature(action)
+            group_name = action.get("batch-group")
+
+            if group_name is not None:
+                batch = groups.get((group_name, signature))
+                # joining the batch moves the action before the ones planned since, unless it depends on them
+                if batch is not None:
+                    position = next(idx for idx, item in enumerate(planned) if item is batch)
+                    if self.conflicts(action, planned[position + 1:]):
+                        batch = None
+            else:
+                batch = current if current and current["signature"] == signature else None
+
+            if batch is None or len(batch["actions"]) >= batch_size:
+                batch = {"command": "text-to-image-batch", "enabled": True, "signature": signature, "actions": []}
+                planned.append(batch)
+
+            batch["actions"].append(action)
+
+            if group_name is not None:
+                groups[(group_name, signature)] = batch
+            else:
+                current = batch
+
+        result = []
+        for action in planned:
+            if action.get("command") == "text-to-image-batch":
+                del action["signature"]
+                if len(action["actions"]) == 1:
+                    action = action["actions"][0]
+            result.append(action)
+
+        return result
+
+    @staticmethod
+    def conflicts(action, others):
+        """Checks whether an action reads what one of the others writes, or writes what they read or write."""
+        reads, writes = ActionIO.reads(action), ActionIO.writes(action)
+
+        for other in others:
+            other_writes = ActionIO.writes(other)
+            if reads & other_writes or writes & (ActionIO.reads(other) | other_writes):
+                return True
+        return False
+
     def text_to_image(self, action):
         try:
             self.logger.info("[SDPHandler] Generating image from text")
@@ -43,6 +119,20 @@ class SDPHandler(BaseHandler):
         except Exception as e:
             self.logger.error(f"[SDPHandler] Error in text_to_image: {e}")
 
+    def text_to_image_batch(self, action):
+        try:
+            actions = action.get("actions", [])
+            self.logger.info(f"[SDPHandler] Generating {len(actions)} images from text in one batch")
+            
+            images = SDPBuilder().text_to_images(actions)
+
+            for sub_action, image in zip(actions, images):
+                sdp_builder = SDPBuilder()
+                sdp_builder.image = image
+                sdp_builder.save(sub_action)
+        except Exception as e:
+            self.logger.error(f"[SDPHandler] Error in text-to-image-batch: {e}")
+
     def image_to_image(self, action):
         try:
             self.logger.info("[SDPHandler] Generating image from text and a base image")
@@ -52,6 +142,18 @@ class SDPHandler(BaseHandler):
         except Exception as e:
             self.logger.error(f"[SDPHandler] Error in image-to-image: {e}")
 
+    def image_variations(self, action):
+        try:
+            self.logger.info("[SDPHandler] Generating image variations from text")
+            
+            sdp_builder = SDPBuilder()
+            sdp_builder.image_variations(action)
+
+            if sdp_builder.image:
+                sdp_builder.save(action, path_key="output-contact-sheet-path")
+        except Exception as e:
+            self.logger.error(f"[SDPHandler] Error in image-variations: {e}")
+
     def draw_text(self, action):
         try:
             self.logger.info("[SDPHandler] Drawing text over image")
@@ -97,3 +199,11 @@ class SDPHandler(BaseHandler):
         except Exception as e:
             self.logger.error(f"[SDPHandler] Error in with-speech-bubbles: {e}")
 
+    def unload_models(self, action):
+        try:
+            self.logger.info("[SDPHandler] Unloading cached diffusion pipelines")
+            
+            sdp_builder = SDPBuilder()
+            sdp_builder.unload_models(action)
+        except Exception as e:
+            self.logger.error(f"[SDPHandler] Error in unload-models: {e}")
@@ -0,0 +1,165 @@
+
+import contextlib
+import json
+import os
+import time
+
+from core.utils             import SimpleLogger
+
+class PerformanceProfile:
+    """
+    Inference tuning applied to diffusion pipelines, selected with 'performance-profile'
+    in the activity defaults: either a preset name, or a dict with an optional 'preset'
+    and individual settings overriding it.
+    """
+
+    SETTINGS = {
+        "intra-op-threads"      : None,     # torch.set_num_threads
+        "inter-op-threads"      : None,     # torch.set_num_interop_threads
+        "channels-last"         : False,    # channels-last memory format for UNet and VAE
+        "attention-slicing"     : False,
+        "vae-slicing"           : False,
+        "vae-tiling"            : False,
+        "bfloat16-autocast"     : False,    # only used when the CPU supports bfloat16
+        "torch-compile"         : False,    # compile the UNet
+        "compile-cache-dir"     : ".cache/torch-compile"
+    }
+
+    PRESETS = {
+        "default"           : {},
+        "cpu-throughput"    : {
+            "intra-op-threads"      : os.cpu_count(),
+            "inter-op-threads"      : 1,
+            "channels-last"         : True,
+            "vae-slicing"           : True,
+            "bfloat16-autocast"     : True
+        },
+        "cpu-low-memory"    : {
+            "attention-slicing"     : True,
+            "vae-slicing"           : True,
+            "vae-tiling"            : True
+        },
+        "cpu-compiled"      : {
+            "intra-op-threads"      : os.cpu_count(),
+            "inter-op-threads"      : 1,
+            "channels-last"         : True,
+            "vae-slicing"           : True,
+            "bfloat16-autocast"     : True,
+            "torch-compile"         : True
+        }
+    }
+
+    def __init__(self, profile=None):
+        self.logger         = SimpleLogger.get_logger()
+
+        if isinstance(profile, dict):
+            overrides   = {k: v for k, v in profile.items() if k != "preset"}
+            self.name   = profile.get("preset", "default")
+        else:
+            overrides   = {}
+            self.name   = profile or "default"
+
+        if self.name not in PerformanceProfile.PRESETS:
+            self.logger.warning(f"[PerformanceProfile] Unknown performance profile: {self.name}. Using default.")
+            self.name = "default"
+
+        self.settings = {**PerformanceProfile.SETTINGS, **PerformanceProfile.PRESETS[self.name], **overrides}
+        if overrides:
+            self.name = f"{self.name}+custom"
+
+    def get(self, key):
+        return self.settings.get(key)
+
+    def key(self):
+        """Returns a stable identifier of the settings, used in pipeline cache keys."""
+        return json.dumps(self.settings, sort_keys=True)
+
+    # Applies the process-wide torch settings (thread pools):
+    # - the inter-op pool can only be sized before it is first used, later attempts are ignored
+    def apply_runtime(self):
+        import torch
+
+        if self.get("intra-op-threads"):
+            torch.set_num_threads(self.get("intra-op-threads"))
+
+        if self.get("inter-op-threads"):
+            try:
+                torch.set_num_interop_threads(self.get("inter-op-threads"))
+            except RuntimeError as e:
+                self.logger.warning(f"[PerformanceProfile] Cannot change inter-op threads: {e}")
+
+        self.logger.info(f"[PerformanceProfile] Profile '{self.name}': {self.settings}")
+        self.logger.info(f"[PerformanceProfile] torch threads: intra-op={torch.get_num_threads()}, inter-op={torch.get_num_interop_threads()}")
+
+    # Applies the pipeline settings after loading:
+    # - memory format, attention and VAE slicing/tiling
+    # - UNet compilation, with the inductor cache stored on disk
+    def apply(self, pipeline):
+        import torch
+
+        if self.get("channels-last"):
+            pipeline.unet.to(memory_format=torch.channels_last)
+            pipeline.vae.to(memory_format=torch.channels_last)
+
+        if self.get("attention-slicing"):
+            pipeline.enable_attention_slicing()
+
+        if self.get("vae-slicing"):
+            pipeline.vae.enable_slicing()
+
+        if self.get("vae-tiling"):
+            pipeline.vae.enable_tiling()
+
+        if self.get("torch-compile"):
+            import torch._inductor.config as inductor_config
+
+            os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", os.path.abspath(self.get("compile-cache-dir")))
+            inductor_config.fx_graph_cache = True
+            pipeline.unet = torch.compile(pipeline.unet)
+
+        return pipeline
+
+    def supports_bfloat16(self, device):
+        import torch
+
+        if device != "cpu":
+            return False
+        try:
+            return torch.backends.mkldnn.is_available() and torch.ops.mkldnn._is_mkldnn_bf16_supported()
+        except Exception:
+            return False
+
+    def autocast(self, device):
+        """Returns the autocast context used around pipeline calls."""
+        import torch
+
+        if self.get("bfloat16-autocast") and self.supports_bfloat16(device):
+            return torch.autocast("cpu", dtype=torch.bfloat16)
+        return contextlib.nullcontext()
+
+    def step_timer(self):
+        """Returns a 'callback_on_step_end' callback logging the latency of each denoising step."""
+        return StepTimer(self.logger)
+
+class StepTimer:
+    """Denoising step callback recording per-step latency."""
+
+    def __init__(self, logger):
+        self.logger         = logger
+        self.latencies      = []
+        self.last           = time.perf_counter()
+
+    def __call__(self, pipeline, step, timestep, callback_kwargs):
+        now = time.perf_counter()
+        self.latencies.append(now - self.last)
+        self.last = now
+
+        self.logger.debug(f"[PerformanceProfile] Step {step + 1}: {self.latencies[-1] * 1000:.0f} ms")
+        return callback_kwargs
+
+    def summary(self):
+        if not self.latencies:
+            return "no steps"
+
+        average = sum(self.latencies) / len(self.latencies)
+        return f"{len(self.latencies)} steps, {average * 1000:.0f} ms/step average, {sum(self.latencies):.1f}s total"
@@ -0,0 +1,197 @@
+
+import copy
+import hashlib
+import json
+import os
+import time
+import torch
+import torch.nn.functional as F
+
+from core.utils             import SimpleLogger, Utils
+
+class WeightOnlyInt8(torch.nn.Module):
+    """Linear or Conv2d layer storing int8 weights (per output channel scale), dequantized at each call."""
+
+    def __init__(self, module):
+        super().__init__()
+        weight = module.weight.detach().float()
+        shape = (-1,) + (1,) * (weight.dim() - 1)
+        scale = (weight.reshape(weight.shape[0], -1).abs().amax(dim=1) / 127.0).clamp(min=1e-8).reshape(shape)
+
+        self.register_buffer("qweight", torch.round(weight / scale).clamp(-127, 127).to(torch.int8))
+        self.register_buffer("scale", scale)
+        self.register_buffer("bias", None if module.bias is None else module.bias.detach().clone())
+
+        self.is_conv = isinstance(module, torch.nn.Conv2d)
+        if self.is_conv:
+            self.conv_args = {
+                "stride"    : module.stride,
+                "padding"   : module.padding,
+                "dilation"  : module.dilation,
+                "groups"    : module.groups
+            }
+            self.in_channels = module.in_channels
+            self.out_channels = module.out_channels
+        else:
+            self.in_features = module.in_features
+            self.out_features = module.out_features
+
+    @staticmethod
+    def supports(module):
+        if type(module) is torch.nn.Linear:
+            return True
+        return type(module) is torch.nn.Conv2d and module.padding_mode == "zeros"
+
+    @property
+    def weight(self):
+        return self.qweight.float() * self.scale
+
+    def forward(self, x):
+        weight = self.qweight.to(x.dtype) * self.scale.to(x.dtype)
+        bias = None if self.bias is None else self.bias.to(x.dtype)
+
+        if self.is_conv:
+            return F.conv2d(x, weight, bias, **self.conv_args)
+        return F.linear(x, weight, bias)
+
+class PipelineQuantizer:
+    """
+    Int8 quantization of the UNet and text encoder of diffusion pipelines on CPU, selected
+    with 'quantization' in the activity defaults:
+     - 'dynamic-int8': linear layers run with int8 weights and dynamically quantized activations
+     - 'weight-only-int8': linear and conv layers store int8 weights, computation stays in float
+    Quantized modules are saved on disk and passed to 'from_pretrained' by later runs.
+    """
+
+    MODES               = ("dynamic-int8", "weight-only-int8")
+    COMPONENTS          = ("unet", "text_encoder")
+
+    def __init__(self, mode=None, cache_dir=".cache/quantized", benchmark=False):
+        self.logger         = SimpleLogger.get_logger()
+        self.mode           = mode
+        self.cache_dir      = cache_dir
+        self.benchmark      = benchmark
+
+        if self.mode is not None and self.mode not in PipelineQuantizer.MODES:
+            self.logger.warning(f"[PipelineQuantizer] Unknown quantization: {self.mode}. Quantization disabled.")
+            self.mode = None
+
+    def enabled(self, device):
+        if self.mode is None:
+            return False
+        if device != "cpu":
+            self.logger.warning(f"[PipelineQuantizer] Quantization '{self.mode}' is only supported on CPU, ignored on {device}")
+            return False
+        return True
+
+    def key(self):
+        return self.mode
+
+    def disk_path(self, model_path, component):
+        key = json.dumps([model_path, self.mode, component, torch.__version__])
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{component}-{self.mode}-{digest}.pt")
+
+    # Returns the quantized components saved by a previous run, to pass to 'from_pretrained':
+    # - components without a readable cache file are quantized after loading
+    def load_cached(self, model_path):
+        components = {}
+        if not self.cache_dir:
+            return components
+
+        for component in PipelineQuantizer.COMPONENTS:
+            path = self.disk_path(model_path, component)
+            if not os.path.isfile(path):
+                continue
+            try:
+                components[component] = torch.load(path, map_location="cpu", weights_only=False)
+                self.logger.info(f"[PipelineQuantizer] Loaded quantized {component} from {path}")
+            except Exception as e:
+                self.logger.warning(f"[PipelineQuantizer] Ignoring unreadable quantized {component}: {e}")
+
+        return components
+
+    # Quantizes the components of a loaded pipeline which were not loaded from the cache:
+    # - logs the memory of each component before and after quantization
+    # - with 'quantization-benchmark', also times a UNet step against the fp32 UNet
+    def apply(self, pipeline, model_path, cached=()):
+        for component in PipelineQuantizer.COMPONENTS:
+            module = getattr(pipeline, component, None)
+            if module is None or component in cached:
+                continue
+
+            reference = copy.deepcopy(module) if self.benchmark and component == "unet" else None
+            size_before = PipelineQuantizer.module_size(module)
+
+            start = time.perf_counter()
+            quantized = self.quantize(module)
+            self.logger.info(
+                f"[PipelineQuantizer] Quantized {component} ({self.mode}) in {time.perf_counter() - start:.1f}s: "
+                f"{size_before / (1 << 20):.0f} MB -> {PipelineQuantizer.module_size(quantized) / (1 << 20):.0f} MB"
+            )
+            setattr(pipeline, component, quantized)
+
+            if reference is not None:
+                self.compare(reference, quantized)
+                del reference
+
+            if self.cache_dir:
+                path = self.disk_path(model_path, component)
+                Utils.ensure_dir(path)
+                torch.save(quantized, path)
+
+        return pipeline
+
+    def quantize(self, module):
+        module = module.eval()
+
+        if self.mode == "dynamic-int8":
+            # dynamic quantization only has kernels for linear layers
+            return torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+        for child in list(module.modules()):
+            for attribute, layer in list(child.named_children()):
+                if WeightOnlyInt8.supports(layer):
+                    setattr(child, attribute, WeightOnlyInt8(layer))
+        return module
+
+    # Times one UNet forward pass with the fp32 and the quantized UNet on the same random inputs
+    def compare(self, reference, quantized):
+        config = reference.config
+        size = config.sample_size if isinstance(config.sample_size, int) else config.sample_size[0]
+        cross_attention_dim = config.cross_attention_dim
+        if isinstance(cross_attention_dim, (list, tuple)):
+            cross_attention_dim = cross_attention_dim[0]
+
+        sample = torch.randn(1, config.in_channels, size, size)
+        timestep = torch.tensor([500])
+        hidden_states = torch.randn(1, 77, cross_attention_dim)
+
+        def measure(unet):
+            with torch.no_grad():
+                unet(sample, timestep, encoder_hidden_states=hidden_states)
+                start = time.perf_counter()
+                unet(sample, timestep, encoder_hidden_states=hidden_states)
+                return time.perf_counter() - start
+
+        try:
+            fp32_time = measure(reference)
+            quantized_time = measure(quantized)
+            self.logger.info(
+                f"[PipelineQuantizer] UNet step: fp32 {fp32_time * 1000:.0f} ms, {self.mode} {quantized_time * 1000:.0f} ms "
+                f"(x{fp32_time / max(quantized_time, 1e-9):.2f})"
+            )
+        except Exception as e:
+            self.logger.warning(f"[PipelineQuantizer] Benchmark failed: {e}")
+
+    @staticmethod
+    def module_size(module):
+        """Returns the bytes held by the tensors of a module's state dict, packed quantized weights included."""
+        def size(value):
+            if isinstance(value, torch.Tensor):
+                return value.numel() * value.element_size()
+            if isinstance(value, (list, tuple)):
+                return sum(size(v) for v in value)
+            return 0
+
+        return sum(size(value) for value in module.state_dict().values())
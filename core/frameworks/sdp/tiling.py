@@ -0,0 +1,66 @@
+
+import math
+
+class TileLayout:
+    """Splits an image in overlapping tiles and blends the processed tiles back together."""
+
+    @staticmethod
+    def positions(length, tile, overlap):
+        """Returns the start offsets of the tiles covering 'length', evenly spread, on multiples of 8."""
+        if length <= tile:
+            return [0]
+
+        count = math.ceil((length - overlap) / max(8, tile - overlap))
+        count = max(count, 2)
+        return [((length - tile) * i // (count - 1)) // 8 * 8 for i in range(count - 1)] + [length - tile]
+
+    @staticmethod
+    def boxes(width, height, tile, overlap):
+        """Returns the (left, top, right, bottom) boxes of the tiles covering the image."""
+        tile_w = min(tile, width)
+        tile_h = min(tile, height)
+
+        return [
+            (x, y, x + tile_w, y + tile_h)
+            for y in TileLayout.positions(height, tile_h, overlap)
+            for x in TileLayout.positions(width, tile_w, overlap)
+        ]
+
+    @staticmethod
+    def weights(width, height, overlap):
+        """Returns a (height, width, 1) feathering mask: linear ramps over the overlap, 1 in the center."""
+        import numpy as np
+
+        ramp = max(1, overlap)
+        x = np.minimum(np.arange(width) + 1, width - np.arange(width)) / ramp
+        y = np.minimum(np.arange(height) + 1, height - np.arange(height)) / ramp
+
+        mask = np.clip(np.minimum(y[:, None], x[None, :]), 1e-3, 1.0)
+        return mask.astype(np.float32)[:, :, None]
+
+class TileBlender:
+    """Accumulates overlapping tiles into one image with feathered blending."""
+
+    def __init__(self, width, height, overlap):
+        import numpy as np
+
+        self.overlap        = overlap
+        self.pixels         = np.zeros((height, width, 3), dtype=np.float32)
+        self.weights        = np.zeros((height, width, 1), dtype=np.float32)
+
+    def add(self, box, image):
+        import numpy as np
+
+        (left, top, right, bottom) = box
+        mask = TileLayout.weights(right - left, bottom - top, self.overlap)
+
+        tile = np.asarray(image.convert("RGB").resize((right - left, bottom - top)), dtype=np.float32)
+        self.pixels[top:bottom, left:right] += tile * mask
+        self.weights[top:bottom, left:right] += mask
+
+    def image(self):
+        import numpy as np
+        from PIL import Image
+
+        pixels = self.pixels / np.maximum(self.weights, 1e-6)
+        return Image.fromarray(np.clip(pixels + 0.5, 0, 255).astype(np.uint8))
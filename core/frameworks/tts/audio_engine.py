@@ -0,0 +1,120 @@
+
+import wave
+
+import numpy as np
+
+from pydub                  import AudioSegment
+
+class AudioEngine:
+    """
+    Concatenates audio segments in linear time:
+     - segments are harmonized to the highest frame rate, channel count and sample width (like pydub does)
+     - the output is preallocated once and each segment is copied in once, or streamed to a WAV file
+     - optional silence ('gap', seconds) or linear crossfade ('crossfade', seconds) between segments
+    """
+
+    DTYPES              = {1: np.int8, 2: np.int16, 4: np.int32}
+
+    def __init__(self, segments, gap=0.0, crossfade=0.0):
+        self.frame_rate     = max(segment.frame_rate for segment in segments)
+        self.channels       = max(segment.channels for segment in segments)
+        self.sample_width   = max(segment.sample_width for segment in segments)
+
+        # crossfades mix samples, which needs a numpy integer type (24-bit audio is mixed as 32-bit)
+        self.mixing         = crossfade > 0 and gap <= 0 and len(segments) > 1
+        if self.mixing and self.sample_width == 3:
+            self.sample_width = 4
+
+        self.segments       = [self.harmonize(segment) for segment in segments]
+        self.gap_frames     = int(round(max(0.0, gap) * self.frame_rate))
+        self.overlaps       = self.compute_overlaps(int(round(crossfade * self.frame_rate)) if self.mixing else 0)
+
+    def harmonize(self, segment):
+        if segment.frame_rate != self.frame_rate:
+            segment = segment.set_frame_rate(self.frame_rate)
+        if segment.channels != self.channels:
+            segment = segment.set_channels(self.channels)
+        if segment.sample_width != self.sample_width:
+            segment = segment.set_sample_width(self.sample_width)
+        return segment
+
+    def frames(self, segment):
+        """Returns a zero-copy (frames, channels) view of a segment (one byte column per frame byte when not mixing)."""
+        if self.mixing:
+            return np.frombuffer(segment.raw_data, dtype=AudioEngine.DTYPES[self.sample_width]).reshape(-1, self.channels)
+        return np.frombuffer(segment.raw_data, dtype=np.uint8).reshape(-1, self.channels * self.sample_width)
+
+    # Returns the number of frames overlapping between each pair of consecutive segments:
+    # - a crossfade never exceeds what is left of either segment
+    def compute_overlaps(self, crossfade_frames):
+        lengths = [int(segment.frame_count()) for segment in self.segments]
+        overlaps = []
+        consumed = 0
+
+        for idx in range(len(lengths) - 1):
+            overlap = min(crossfade_frames, lengths[idx] - consumed, lengths[idx + 1])
+            overlaps.append(overlap)
+            consumed = overlap
+
+        return overlaps
+
+    def total_frames(self):
+        lengths = sum(int(segment.frame_count()) for segment in self.segments)
+        return lengths + self.gap_frames * (len(self.segments) - 1) - sum(self.overlaps)
+
+    def blocks(self):
+        """Yields the output frames in order, as arrays of frames."""
+        tail = None
+        count = len(self.segments)
+
+        for idx, segment in enumerate(self.segments):
+            samples = self.frames(segment)
+            start = self.overlaps[idx - 1] if idx > 0 else 0
+            end = len(samples) - (self.overlaps[idx] if idx < count - 1 else 0)
+
+            if idx > 0:
+                if self.gap_frames:
+                    yield np.zeros((self.gap_frames, samples.shape[1]), dtype=samples.dtype)
+                if start:
+                    yield self.crossfade(tail, samples[:start])
+
+            yield samples[start:end]
+            tail = samples[end:]
+
+    def crossfade(self, fade_out, fade_in):
+        info = np.iinfo(fade_out.dtype)
+        ramp = np.linspace(0.0, 1.0, len(fade_in), endpoint=False, dtype=np.float64)[:, None]
+
+        mixed = fade_out * (1.0 - ramp) + fade_in * ramp
+        return np.clip(np.round(mixed), info.min, info.max).astype(fade_out.dtype)
+
+    def to_segment(self):
+        frame_width = self.channels * self.sample_width
+        output = np.empty(self.total_frames() * frame_width, dtype=np.uint8)
+        offset = 0
+
+        for block in self.blocks():
+            data = block.reshape(-1).view(np.uint8)
+            output[offset:offset + data.size] = data
+            offset += data.size
+
+        return AudioSegment(
+            output.tobytes(),
+            frame_rate=self.frame_rate,
+            sample_width=self.sample_width,
+            channels=self.channels
+        )
+
+    def write_wav(self, destination_path):
+        with wave.open(destination_path, "wb") as wav_file:
+            wav_file.setnchannels(self.channels)
+            wav_file.setsampwidth(self.sample_width)
+            wav_file.setframerate(self.frame_rate)
+            wav_file.setnframes(self.total_frames())
+
+            for block in self.blocks():
+                data = np.ascontiguousarray(block).reshape(-1).view(np.uint8)
+                if self.sample_width == 1:
+                    # 8-bit WAV samples are unsigned, pydub keeps them signed in memory
+                    data = data + np.uint8(128)
+                wav_file.writeframes(data.tobytes())
@@ -0,0 +1,153 @@
+
+import subprocess
+import wave
+
+from concurrent.futures     import ThreadPoolExecutor
+from core.utils             import SimpleLogger, Utils
+from pydub                  import AudioSegment
+from pydub.utils            import mediainfo_json
+
+class StreamingSplitter:
+    """
+    Splits an audio file into '<output>_partN.wav' files without loading it in memory:
+     - PCM WAV inputs are read in chunks, one reader per part, and the parts are written in parallel threads
+     - other formats are decoded by an ffmpeg pipe (16-bit PCM) and written part after part
+    Split frames are computed like pydub slices, so parts match the in-memory split.
+    """
+
+    def __init__(self, source_path, workers=4, chunk_frames=1 << 18):
+        self.logger         = SimpleLogger.get_logger()
+        self.source_path    = source_path
+        self.workers        = workers
+        self.chunk_frames   = chunk_frames
+        self.params         = self.read_params()
+
+    # Reads the stream parameters (frame rate, channels, sample width, frame count):
+    # - from the WAV header when the file is a PCM WAV
+    # - otherwise from ffprobe, decoding to 16-bit samples; the frame count is estimated from the container
+    #   duration (inexact for e.g. VBR MP3) and corrected to the decoded count by the split
+    def read_params(self):
+        try:
+            with wave.open(self.source_path, "rb") as wav_file:
+                return {
+                    "format"        : "wav",
+                    "frame_rate"    : wav_file.getframerate(),
+                    "channels"      : wav_file.getnchannels(),
+                    "sample_width"  : wav_file.getsampwidth(),
+                    "frames"        : wav_file.getnframes()
+                }
+        except (wave.Error, EOFError):
+            pass
+
+        info = mediainfo_json(self.source_path)
+        stream = next(s for s in info["streams"] if s.get("codec_type") == "audio")
+        params = {
+            "format"        : "ffmpeg",
+            "frame_rate"    : int(stream["sample_rate"]),
+            "channels"      : int(stream["channels"]),
+            "sample_width"  : 2
+        }
+
+        duration = float(stream.get("duration") or info["format"]["duration"])
+        params["frames"] = int(round(duration * params["frame_rate"]))
+        return params
+
+    def decode_command(self, params):
+        return [
+            AudioSegment.converter, "-v", "error", "-i", self.source_path,
+            "-f", "s16le", "-acodec", "pcm_s16le",
+            "-ar", str(params["frame_rate"]), "-ac", str(params["channels"]),
+            "-"
+        ]
+
+    def duration(self):
+        """Returns the duration in seconds, rounded to the millisecond like len(AudioSegment)."""
+        return round(1000 * self.params["frames"] / self.params["frame_rate"]) / 1000.0
+
+    def to_frame(self, seconds):
+        length_ms = round(1000 * self.params["frames"] / self.params["frame_rate"])
+        milliseconds = min(int(seconds * 1000), length_ms)
+        return int(milliseconds * self.params["frame_rate"] / 1000.0)
+
+    def split(self, split_times, output_audio_path):
+        """Writes one part per interval between the given (valid, sorted) split times, the last one being the end."""
+        parts = []
+        start = 0
+        for idx, split_time in enumerate(split_times):
+            end = self.to_frame(split_time)
+            parts.append((f"{output_audio_path}_part{idx+1}.wav", start, end))
+            start = end
+
+        for path, _, _ in parts:
+            Utils.ensure_dir(path)
+
+        if self.params["format"] == "wav":
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for future in [executor.submit(self.copy_wav_part, *part) for part in parts]:
+                    future.result()
+        else:
+            self.split_ffmpeg_stream(parts)
+
+    def open_part(self, path):
+        part = wave.open(path, "wb")
+        part.setnchannels(self.params["channels"])
+        part.setsampwidth(self.params["sample_width"])
+        part.setframerate(self.params["frame_rate"])
+        return part
+
+    def pad(self, part, frames):
+        """Pads the end of the last part with silence, like pydub does for the last millisecond."""
+        if frames > 0:
+            silence = b"\x80" if self.params["sample_width"] == 1 else b"\x00"
+            part.writeframes(silence * (frames * self.params["channels"] * self.params["sample_width"]))
+
+    def copy_wav_part(self, path, start, end):
+        self.logger.info(f"[StreamingSplitter] Writing {path} (frames {start}-{end})")
+
+        with wave.open(self.source_path, "rb") as source, self.open_part(path) as part:
+            source.setpos(start)
+            remaining = end - start
+
+            while remaining > 0:
+                data = source.readframes(min(self.chunk_frames, remaining))
+                if not data:
+                    break
+                part.writeframes(data)
+                remaining -= len(data) // (self.params["channels"] * self.params["sample_width"])
+
+            self.pad(part, remaining)
+
+    # Writes the parts from one decoding pipe:
+    # - the last part is read until the end of the stream; the frame count is then set to the decoded one
+    #   (the file is decoded once) and the last part is padded up to the exact duration, like pydub slices
+    def split_ffmpeg_stream(self, parts):
+        frame_width = self.params["channels"] * self.params["sample_width"]
+
+        decoded = 0
+
+        with subprocess.Popen(self.decode_command(self.params), stdout=subprocess.PIPE) as process:
+            for idx, (path, start, end) in enumerate(parts):
+                self.logger.info(f"[StreamingSplitter] Writing {path} (frames {start}-{end})")
+                last = idx == len(parts) - 1
+
+                with self.open_part(path) as part:
+                    remaining = end - start
+                    while remaining > 0 or last:
+                        data = process.stdout.read((self.chunk_frames if last else min(self.chunk_frames, remaining)) * frame_width)
+                        if not data:
+                            break
+                        part.writeframes(data)
+                        remaining -= len(data) // frame_width
+                        decoded += len(data) // frame_width
+
+                    if last:
+                        self.params["frames"] = decoded
+                        remaining = self.to_frame(self.duration()) - max(start, decoded)
+
+                    self.pad(part, remaining)
+
+            process.stdout.close()
+            process.wait()
+
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg could not decode {self.source_path} ({process.returncode})")
@@ -1,30 +1,72 @@
 
+import multiprocessing
 import numpy as np
-import whisper
+import os
+import threading
 
+from concurrent.futures     import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from core.frameworks.base   import BaseBuilder
-from core.utils             import Utils
+from core.frameworks.tts    import synthesis
+from core.frameworks.tts.audio_engine import AudioEngine
+from core.frameworks.tts.audio_stream import StreamingSplitter
+from core.frameworks.tts.phrase_cache import PhraseCache
+from core.frameworks.tts.speaker_cache import SpeakerEmbeddingCache
+from core.utils             import ModelPool, Utils
 from pydub                  import AudioSegment
 from TTS.api                import TTS
 from TTS.utils.manage       import ModelManager
 
 class TTSBuilder(BaseBuilder):
+    # loaded TTS models keyed by model path, shared across activities and pipelines
+    models              = ModelPool("tts", max_entries=2)
+    default_model_path  = "tts_models/multilingual/multi-dataset/your_tts"
+    # ((model-path, workers), executor) of the chunked synthesis process pool
+    synthesis_pool      = None
+    synthesis_lock      = threading.Lock()
+    # disk cache of synthesized sentences, enabled by 'phrase-cache-dir'
+    phrases             = None
+    # speaker conditioning computed from reference voices ('input-voice-path')
+    speakers            = SpeakerEmbeddingCache()
+
     def __init__(self):
         super().__init__()
         self.audio          = None
+        self.streamed       = False
 
     # load defaults for TTSBuilder class:
-    # - reads default model-path
-    # - initializes and stores a default TTS model at the class level
+    # - reads default model-path (loaded on first use, not here)
+    # - 'max-loaded-models' and 'memory-budget-mb' bound the model pool
+    # - 'phrase-cache-dir' and 'phrase-cache-size-mb' configure the phrase cache
+    # - 'speaker-cache-dir' stores speaker embeddings of reference voices (null keeps them in memory only)
+    # - reads whisper defaults used for transcripts
     @staticmethod
     def load_defaults(defaults):
-        model_path          = defaults.get("model-path", "tts_models/multilingual/multi-dataset/your_tts")
+        TTSBuilder.default_model_path = defaults.get("model-path", "tts_models/multilingual/multi-dataset/your_tts")
+        TTSBuilder.models.configure(
+            max_entries=defaults.get("max-loaded-models"),
+            memory_budget_mb=defaults.get("memory-budget-mb")
+        )
+
+        phrase_cache_dir = defaults.get("phrase-cache-dir")
+        if phrase_cache_dir:
+            TTSBuilder.phrases = PhraseCache(phrase_cache_dir, defaults.get("phrase-cache-size-mb", 1024))
+        else:
+            TTSBuilder.phrases = None
+
+        TTSBuilder.speakers.configure(defaults.get("speaker-cache-dir", ".cache/speakers"))
+
+        TTSBuilder.load_whisper_defaults(defaults)
+
+    # Returns the TTS model of the given path from the model pool, loading it on first use
+    def get_model(self, model_path=None):
+        model_path          = model_path or TTSBuilder.default_model_path
 
-        TTSBuilder.tts      = TTS(model_path)
+        return TTSBuilder.models.get(model_path, lambda: TTS(model_path))
 
     # Resolves and returns TTS model along with speech synthesis settings:
-    # - initializes a new TTS model if 'model-path' is provided in action
-    # - otherwise uses the class's default TTS model
+    # - uses the pooled TTS model of the action's 'model-path', or of the default model path
+    # - reference voices are conditioned once per model and voice file content (speaker embedding cache)
     # - extracts and returns speech parameters like speed, energy, speaker, and speaker embeddings
     # - returns all as a dictionary for convenient access
     def resolve_model_settings(self, action):
@@ -35,11 +77,10 @@ class TTSBuilder(BaseBuilder):
         speaker_wav         = action.get("input-voice-path", None)
         language            = action.get("language", None)
 
-        if model_path:
-            self.logger.debug(f"[TTSHandler] Initialized object's TTS model: {model_path}")
-            tts = TTS(model_path)
-        else:
-            tts = TTSBuilder.tts
+        tts = self.get_model(model_path)
+
+        if speaker_wav:
+            TTSBuilder.speakers.install(tts, model_path or TTSBuilder.default_model_path)
 
         # If no speaker specified but model has speakers, use default and warn
         if speaker is None and hasattr(tts, "speakers") and tts.speakers:
@@ -70,15 +111,16 @@ class TTSBuilder(BaseBuilder):
 
     # Save audio:
     # - Saves provided audio file to specified destination
+    # - the file is written in the background; actions reading it wait for the write to complete
     def save_audio(self, audio, destination_path):
-        try:
-            self.logger.info(f"[TTSBuilder] Saving audio to: {destination_path}")
-            
-            Utils.ensure_dir(destination_path)
-            
-            audio.export(destination_path, format="wav")
-        except Exception as e:
-            self.logger.error(f"[TTSBuilder] Error while saving audio: {e}")
+        self.logger.info(f"[TTSBuilder] Saving audio to: {destination_path}")
+
+        BaseBuilder.writer.submit(destination_path, self.write_audio, audio, destination_path)
+
+    def write_audio(self, audio, destination_path):
+        Utils.ensure_dir(destination_path)
+
+        audio.export(destination_path, format="wav")
 
     # Default load function adapted to audio:
     # - loads an audio file from specified source
@@ -102,6 +144,10 @@ class TTSBuilder(BaseBuilder):
     def save(self, action, path_key="output-audio-path", cache_key="audio-name") -> 'TTSBuilder':
         audio_name          = action.get(cache_key)
         output_audio_path   = action.get(path_key)
+
+        # the audio was already written while it was built
+        if self.streamed:
+            return self
         
         if not (output_audio_path or audio_name):
             self.logger.error("[TTSBuilder] No save target specified (file or cache).")
@@ -113,16 +159,23 @@ class TTSBuilder(BaseBuilder):
             self.save_to_cache("audio", audio_name, self.audio)
         return self
 
+    # Converts audio to whisper input:
+    # - resamples the in-memory audio to 16 kHz mono 16-bit
+    # - returns its samples as a float32 array in [-1, 1]
+    @staticmethod
+    def to_whisper_samples(audio):
+        audio = audio.set_frame_rate(16000).set_channels(1).set_sample_width(2)
+
+        return np.frombuffer(audio.raw_data, dtype=np.int16).astype(np.float32) / 32768.0
+
     # Generate trasncript function:
     # - uses whisper to generate a word by word transcript
+    # - the audio is handed to whisper in memory (no temporary file)
     def generate_transcript(self, action) -> 'TTSBuilder':
         output_text_path        = action.get("output-text-path")
         
-        temp_file = output_text_path + ".wav"
-        self.save_audio(self.audio, temp_file)
-        
-        model = whisper.load_model("base")
-        result = model.transcribe(temp_file, word_timestamps=True)
+        samples = self.to_whisper_samples(self.audio)
+        result = self.transcribe(samples, action, word_timestamps=True)
 
         words_info = []
         for segment in result['segments']:
@@ -140,21 +193,23 @@ class TTSBuilder(BaseBuilder):
             end_time    = Utils.format_time(word_info['end_time'])
             word = word_info['word'].strip()
             transcript_text += f"{i}\n{start_time} --> {end_time}\n{word}\n\n"
-        
-        #Delete temporary file
-        Utils.delete_file(temp_file)
-        #Now save the transcript
+
         self.save_text(transcript_text, output_text_path)
             
         return self
 
-    # Generate transcript function:
+    # Combine audios function:
     # - reads audios from disk and adds them to combine list
     # - reads audios from cache and adds them to combine list
-    # - takes all audios from combine list and combines them in one final audio file
+    # - joins them in linear time, with an optional 'gap' or 'crossfade' (seconds) between them
+    # - without 'audio-name', streams the result straight to 'output-audio-path' (WAV)
     def combine_audios(self, action) -> 'TTSBuilder':
         input_audio_paths   = action.get("input-audio-paths")
         audio_names         = action.get("audio-names")
+        output_audio_path   = action.get("output-audio-path")
+        audio_name          = action.get("audio-name")
+        gap                 = action.get("gap", 0.0)
+        crossfade           = action.get("crossfade", 0.0)
 
         segments = []
 
@@ -167,8 +222,8 @@ class TTSBuilder(BaseBuilder):
 
         # Load audio from cache
         if audio_names:
-            for audio_name in audio_names:
-                segment = self.load_from_cache("audio", audio_name)
+            for name in audio_names:
+                segment = self.load_from_cache("audio", name)
                 if segment:
                     segments.append(segment)
 
@@ -176,7 +231,21 @@ class TTSBuilder(BaseBuilder):
             self.logger.error("[TTSBuilder] No valid audio segments found to merge.")
             return self
 
-        self.audio = sum(segments)
+        if gap > 0 and crossfade > 0:
+            self.logger.warning("[TTSBuilder] Both 'gap' and 'crossfade' are set. Ignoring crossfade.")
+
+        engine = AudioEngine(segments, gap=gap, crossfade=crossfade)
+
+        if output_audio_path and not audio_name:
+            self.logger.info(f"[TTSBuilder] Streaming {len(segments)} combined audios to: {output_audio_path}")
+
+            BaseBuilder.writer.wait([output_audio_path])
+            Utils.ensure_dir(output_audio_path)
+            engine.write_wav(output_audio_path)
+            self.streamed = True
+            return self
+
+        self.audio = engine.to_segment()
         return self
 
     # Create silence function:
@@ -209,12 +278,50 @@ class TTSBuilder(BaseBuilder):
 
         return self
 
+    # prune-phrase-cache command:
+    # - evicts least recently used phrases down to 'max-size-mb' (defaults to 'phrase-cache-size-mb')
+    def prune_phrase_cache(self, action) -> 'TTSBuilder':
+        if TTSBuilder.phrases is None:
+            self.logger.warning("[TTSBuilder] Phrase cache is not enabled ('phrase-cache-dir').")
+            return self
+
+        TTSBuilder.phrases.prune(action.get("max-size-mb"))
+        return self
+
+    # Returns the sorted split times within the audio, followed by its end
+    def get_split_times(self, action, audio_length_sec):
+        split_times         = action.get("split-times", [])
+
+        # Filter valid split times
+        valid_split_times = []
+        for t in sorted(split_times):
+            if 0 < t < audio_length_sec:
+                valid_split_times.append(t)
+            else:
+                self.logger.warning(f"[TTSBuilder] Ignoring out-of-range split time: {t}")
+
+        valid_split_times.append(audio_length_sec)  # ensure final split
+
+        return valid_split_times
+
+    # Streaming split is used for 'input-audio-path' files when:
+    # - 'streaming' is true
+    # - or the file is larger than 'streaming-threshold-mb' (default 1024)
+    def use_streaming_split(self, action):
+        input_audio_path    = action.get("input-audio-path")
+        streaming           = action.get("streaming")
+        threshold_mb        = action.get("streaming-threshold-mb", 1024)
+
+        if not input_audio_path or streaming is False:
+            return False
+
+        return bool(streaming) or os.path.getsize(input_audio_path) > threshold_mb * (1 << 20)
+
     # split-audio command:
     # - loads the target audio
     # - splits it in more audios
     def split_audio(self, action) -> 'TTSBuilder':
         output_audio_path   = action.get("output-audio-path")
-        split_times         = action.get("split-times", [])
 
         if not output_audio_path:
             self.logger.error("[TTSBuilder] No output audio path provided.")
@@ -223,15 +330,7 @@ class TTSBuilder(BaseBuilder):
         audio = self.audio
         audio_length_sec = len(audio) / 1000.0  # duration in seconds
 
-        # Filter valid split times
-        valid_split_times = []
-        for t in sorted(split_times):
-            if 0 < t < audio_length_sec:
-                valid_split_times.append(t)
-            else:
-                self.logger.warning(f"[TTSBuilder] Ignoring out-of-range split time: {t}")
-
-        valid_split_times.append(audio_length_sec)  # ensure final split
+        valid_split_times = self.get_split_times(action, audio_length_sec)
 
         # Split and save chunks
         self.logger.info(f"[TTSBuilder] Splitting audio at: {valid_split_times}")
@@ -248,12 +347,147 @@ class TTSBuilder(BaseBuilder):
 
         return self
 
-    # Generates speech based on provided parameters
+    # streaming split-audio:
+    # - reads 'input-audio-path' in chunks (memory does not depend on the input length)
+    # - writes the parts of WAV inputs in 'split-workers' parallel threads (default 4)
+    def split_audio_streaming(self, action) -> 'TTSBuilder':
+        input_audio_path    = action.get("input-audio-path")
+        output_audio_path   = action.get("output-audio-path")
+        workers             = action.get("split-workers", 4)
+
+        if not output_audio_path:
+            self.logger.error("[TTSBuilder] No output audio path provided.")
+            return self
+
+        splitter = StreamingSplitter(input_audio_path, workers=workers)
+        valid_split_times = self.get_split_times(action, splitter.duration())
+
+        self.logger.info(f"[TTSBuilder] Streaming split of {input_audio_path} at: {valid_split_times}")
+        splitter.split(valid_split_times, output_audio_path)
+
+        return self
+
+    # Converts synthesized float samples to audio:
+    # - peak-normalizes like the TTS library does when writing wav files
+    # - returns a 16-bit mono AudioSegment
+    @staticmethod
+    def wav_to_segment(wav, sample_rate):
+        wav = np.asarray(wav, dtype=np.float32)
+        samples = (wav * (32767 / max(0.01, float(np.max(np.abs(wav))) if wav.size else 0.0))).astype(np.int16)
+
+        return AudioSegment(samples.tobytes(), frame_rate=sample_rate, sample_width=2, channels=1)
+
+    # Returns the process pool synthesizing chunks with the given model:
+    # - each worker loads the model once, in the pool initializer
+    # - the pool is kept for later actions using the same model and worker count
+    def get_synthesis_pool(self, model_path, workers):
+        key = (model_path, workers)
+
+        with TTSBuilder.synthesis_lock:
+            if TTSBuilder.synthesis_pool and TTSBuilder.synthesis_pool[0] != key:
+                TTSBuilder.synthesis_pool[1].shutdown()
+                TTSBuilder.synthesis_pool = None
+
+            if TTSBuilder.synthesis_pool is None:
+                self.logger.info(f"[TTSBuilder] Starting {workers} synthesis workers for: {model_path}")
+                executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=synthesis.init_worker,
+                    initargs=(model_path, TTSBuilder.speakers.cache_dir)
+                )
+                TTSBuilder.synthesis_pool = (key, executor)
+
+            return TTSBuilder.synthesis_pool[1]
+
+    def drop_synthesis_pool(self, executor):
+        """Discards a broken synthesis pool, so the next chunked action starts new workers."""
+        with TTSBuilder.synthesis_lock:
+            if TTSBuilder.synthesis_pool and TTSBuilder.synthesis_pool[1] is executor:
+                TTSBuilder.synthesis_pool = None
+
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    # Chunked synthesis ('chunk-by': 'sentence' or 'paragraph'):
+    # - chunks are synthesized in 'synthesis-workers' processes (serially in this process with one worker)
+    # - a broken worker pool is dropped and the remaining chunks are synthesized in this process
+    # - each chunk is seeded with 'seed' + its index, so the result does not depend on the worker count
+    # - in this process, each chunk holds the pooled model's lock, so threads sharing the model do not interleave
+    # - with the phrase cache enabled, only sentences missing from the cache are synthesized
+    # - chunks are stitched in order with 'chunk-silence' seconds between them, then normalized once
+    def synthesize_chunks(self, action, tts_settings, text):
+        chunk_by            = action.get("chunk-by", "sentence")
+        workers             = action.get("synthesis-workers", 1)
+        chunk_silence       = action.get("chunk-silence", 0.0)
+        seed                = action.get("seed", 0)
+
+        tts = tts_settings["tts"]
+        model_path = action.get("model-path") or TTSBuilder.default_model_path
+        sample_rate = tts.synthesizer.output_sample_rate
+        chunks = synthesis.split_text(text, chunk_by)
+        phrases = TTSBuilder.phrases
+
+        requests = [
+            (seed + idx, {
+                "text"              : chunk,
+                "speed"             : tts_settings["speed"],
+                "energy"            : tts_settings["energy"],
+                "speaker"           : tts_settings["speaker"],
+                "speaker_wav"       : tts_settings["speaker_wav"],
+                "language"          : tts_settings["language"]
+            })
+            for idx, chunk in enumerate(chunks)
+        ]
+
+        wavs = [None] * len(chunks)
+        keys = [phrases.key(model_path, tts_settings, chunk, seed + idx) for idx, chunk in enumerate(chunks)] if phrases else []
+        if phrases:
+            wavs = [phrases.get(key) for key in keys]
+
+        missing = [idx for idx, wav in enumerate(wavs) if wav is None]
+        self.logger.info(f"[TTSBuilder] Synthesizing {len(missing)} of {len(chunks)} chunks ({chunk_by}) with {workers} workers")
+
+        if workers > 1 and len(missing) > 1:
+            executor = self.get_synthesis_pool(model_path, workers)
+            try:
+                futures = {idx: executor.submit(synthesis.synthesize_in_worker, *requests[idx]) for idx in missing}
+                for idx, future in futures.items():
+                    wavs[idx] = future.result()
+            except BrokenProcessPool as e:
+                # a worker died (e.g. failed to load the model or was killed): finish in this process
+                self.logger.warning(f"[TTSBuilder] Synthesis workers failed, synthesizing in this process: {e}")
+                self.drop_synthesis_pool(executor)
+
+        for idx in missing:
+            if wavs[idx] is None:
+                with TTSBuilder.models.lock(model_path):
+                    wavs[idx] = synthesis.synthesize(tts, *requests[idx])
+
+        if phrases and missing:
+            for idx in missing:
+                phrases.put(keys[idx], wavs[idx])
+            phrases.prune_if_full()
+
+        silence = np.zeros(int(round(chunk_silence * sample_rate)), dtype=np.float32)
+        parts = []
+        for idx, wav in enumerate(wavs):
+            if idx > 0 and silence.size:
+                parts.append(silence)
+            parts.append(wav)
+
+        wav = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+        return TTSBuilder.wav_to_segment(wav, sample_rate)
+
+    # Generates speech based on provided parameters:
+    # - the waveform is synthesized in memory; files are only written by save ('output-audio-path')
+    # - the pooled model is locked while it synthesizes, as other threads may share it
     def text_to_speech(self, action) -> 'TTSBuilder':
         """Synthesize the speech from current text and other settings."""
-        output_audio_path   = action.get("output-audio-path")
-        
         tts_settings = self.resolve_model_settings(action)
+
+        if action.get("chunk-by") or TTSBuilder.phrases:
+            self.audio = self.synthesize_chunks(action, tts_settings, self.get_text(action))
+            return self
         
         tts = tts_settings["tts"]
         
@@ -265,16 +499,14 @@ class TTSBuilder(BaseBuilder):
             "energy"            : tts_settings["energy"],
             "speaker"           : tts_settings["speaker"],
             "speaker_wav"       : tts_settings["speaker_wav"],
-            "language"          : tts_settings["language"],
-            "file_path"         : output_audio_path
+            "language"          : tts_settings["language"]
         }
 
-        Utils.ensure_dir(output_audio_path)
-        
-        tts.tts_to_file(**kwargs)
+        with TTSBuilder.models.lock(action.get("model-path") or TTSBuilder.default_model_path):
+            wav = tts.tts(**kwargs)
 
-        # Load the result into memory for further operations
-        self.audio = self.load_audio(output_audio_path)
+        # Wrap the waveform like 'tts_to_file' would write it, without touching disk
+        self.audio = TTSBuilder.wav_to_segment(wav, tts.synthesizer.output_sample_rate)
             
         return self
 
@@ -11,6 +11,7 @@ class TTSHandler(BaseHandler):
             "combine-audios"            : self.combine_audios,
             "create-silence"            : self.create_silence,
             "show-models"               : self.show_models,
+            "prune-phrase-cache"        : self.prune_phrase_cache,
             "show-speakers"             : self.show_speakers,
             "split-audio"               : self.split_audio,
             "text-to-speech"            : self.text_to_speech
@@ -72,6 +73,18 @@ class TTSHandler(BaseHandler):
         except Exception as e:
             self.logger.error(f"[TTSHandler] Error in show-models: {e}")
 
+    # prune-phrase-cache command:
+    # - evicts least recently used phrases from the phrase cache
+    def prune_phrase_cache(self, action):
+        try:
+            self.logger.info("[TTSHandler] Pruning phrase cache")
+
+            tts_builder = TTSBuilder()
+            tts_builder.prune_phrase_cache(action)
+            
+        except Exception as e:
+            self.logger.error(f"[TTSHandler] Error in prune-phrase-cache: {e}")
+
     # show-speakers command:
     # - shows speakers for specific TTS model
     def show_speakers(self, action):
@@ -92,7 +105,10 @@ class TTSHandler(BaseHandler):
             self.logger.info("[TTSHandler] Splitting audio file")
 
             tts_builder = TTSBuilder()
-            tts_builder.load(action).split_audio(action)
+            if tts_builder.use_streaming_split(action):
+                tts_builder.split_audio_streaming(action)
+            else:
+                tts_builder.load(action).split_audio(action)
             
         except Exception as e:
             self.logger.error(f"[TTSHandler] Error in split-audio: {e}")
@@ -0,0 +1,143 @@
+
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from core.utils             import SimpleLogger, Utils
+
+class PhraseCache:
+    """
+    Disk cache of synthesized phrases (float samples stored as .npy files), keyed by the
+    model, the voice settings, the seed and the normalized text. Files are evicted in least-recently-used
+    order (file modification time, refreshed on each hit) when the cache exceeds its size cap.
+    """
+
+    def __init__(self, cache_dir, max_size_mb=1024):
+        self.logger         = SimpleLogger.get_logger()
+        self.cache_dir      = cache_dir
+        self.max_size_mb    = max_size_mb
+        self.hits           = 0
+        self.misses         = 0
+        self._lock          = threading.Lock()
+        self._file_hashes   = {}
+        # total size of the cached files: scanned once, then tracked by put and prune
+        self._size          = None
+
+    def file_hash(self, path):
+        """Returns the sha256 of a file's content, memoized by path, size and modification time."""
+        if not path:
+            return None
+
+        stat = os.stat(path)
+        signature = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+        if signature not in self._file_hashes:
+            self._file_hashes[signature] = Utils.file_sha256(path)
+
+        return self._file_hashes[signature]
+
+    def key(self, model_path, settings, text, seed):
+        key = [
+            model_path,
+            seed,
+            settings.get("speaker"),
+            settings.get("language"),
+            settings.get("speed"),
+            settings.get("energy"),
+            self.file_hash(settings.get("speaker_wav")),
+            " ".join(text.split())
+        ]
+        return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.npy")
+
+    def get(self, key):
+        path = self.path(key)
+
+        try:
+            wav = np.load(path)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return wav
+
+    def put(self, key, wav):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as file:
+            np.save(file, np.asarray(wav, dtype=np.float32))
+
+        size = os.path.getsize(temp_path)
+        previous = os.path.getsize(path) if os.path.isfile(path) else 0
+        os.replace(temp_path, path)
+
+        with self._lock:
+            if self._size is not None:
+                self._size += size - previous
+
+    def entries(self):
+        """Returns (modification time, size, path) of the cached files, oldest first."""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+
+        for directory, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".npy"):
+                    path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+        return sorted(entries)
+
+    # Evicts the least recently used phrases until the cache fits in max_size_mb:
+    # - defaults to the configured size cap; 0 empties the cache
+    # - returns the number of removed files
+    def prune(self, max_size_mb=None):
+        max_size_mb = self.max_size_mb if max_size_mb is None else max_size_mb
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+
+        for _, size, path in entries:
+            if total <= max_size_mb * (1 << 20):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+
+        with self._lock:
+            self._size = total
+
+        if removed:
+            self.logger.info(f"[PhraseCache] Evicted {removed} phrases, {total / (1 << 20):.1f} MB left")
+        return removed
+
+    def prune_if_full(self):
+        """Prunes the cache only when its tracked size exceeds the size cap (files added by other processes are seen on the next scan)."""
+        with self._lock:
+            size = self._size
+        if size is None:
+            size = sum(size for _, size, _ in self.entries())
+            with self._lock:
+                self._size = size
+
+        if size > self.max_size_mb * (1 << 20):
+            self.prune()
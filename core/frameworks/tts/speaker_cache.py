@@ -0,0 +1,117 @@
+
+import functools
+import hashlib
+import json
+import os
+import threading
+
+from core.utils             import SimpleLogger, Utils
+
+class SpeakerEmbeddingCache:
+    """
+    Cache of speaker conditioning computed from reference voices ('input-voice-path'),
+    keyed by model and reference file content, kept in memory and on disk.
+    It wraps the methods the TTS models call on every synthesis:
+     - 'speaker_manager.compute_embedding_from_clip' (d-vector models, e.g. YourTTS)
+     - 'get_conditioning_latents' (XTTS)
+    """
+
+    def __init__(self, cache_dir=".cache/speakers"):
+        self.cache_dir      = cache_dir
+        self.entries        = {}
+        self.hits           = 0
+        self.misses         = 0
+        self._lock          = threading.Lock()
+
+    @property
+    def logger(self):
+        return SimpleLogger.get_logger()
+
+    def configure(self, cache_dir=None):
+        self.cache_dir = cache_dir
+
+    def key(self, model_path, method, references, kwargs):
+        references = references if isinstance(references, (list, tuple)) else [references]
+        hashes = [Utils.file_sha256(path) for path in references]
+
+        key = [model_path, method, hashes, sorted((k, repr(v)) for k, v in kwargs.items())]
+        return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+
+    def disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pt")
+
+    # Returns the cached result of compute(), from memory, then from disk, and finally computed
+    def get(self, key, compute):
+        import torch
+
+        with self._lock:
+            if key in self.entries:
+                self.hits += 1
+                return self.entries[key]
+
+        value = None
+        if self.cache_dir and os.path.isfile(self.disk_path(key)):
+            try:
+                value = torch.load(self.disk_path(key), map_location="cpu", weights_only=False)
+            except Exception as e:
+                self.logger.warning(f"[SpeakerEmbeddingCache] Ignoring unreadable speaker embedding: {e}")
+
+        if value is None:
+            value = compute()
+            self.logger.info(f"[SpeakerEmbeddingCache] Computed speaker conditioning: {key[:12]}")
+
+            if self.cache_dir:
+                path = self.disk_path(key)
+                Utils.ensure_dir(path)
+                torch.save(value, path)
+
+        with self._lock:
+            self.misses += 1
+            self.entries[key] = value
+        return value
+
+    # Wraps the speaker conditioning methods of a loaded TTS model (once per model instance):
+    # - cached tensors are moved back to the model's device before use
+    def install(self, tts, model_path):
+        model = getattr(getattr(tts, "synthesizer", None), "tts_model", None)
+        if model is None or getattr(model, "_speaker_cache_installed", False):
+            return
+
+        speaker_manager = getattr(model, "speaker_manager", None)
+        if speaker_manager is not None and hasattr(speaker_manager, "compute_embedding_from_clip"):
+            speaker_manager.compute_embedding_from_clip = self.wrap(
+                speaker_manager.compute_embedding_from_clip, model_path, "embedding", "wav_file", model
+            )
+
+        if hasattr(model, "get_conditioning_latents"):
+            model.get_conditioning_latents = self.wrap(
+                model.get_conditioning_latents, model_path, "latents", "audio_path", model
+            )
+
+        model._speaker_cache_installed = True
+
+    def wrap(self, method, model_path, name, reference_argument, model):
+        cache = self
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            references = args[0] if args else kwargs.get(reference_argument)
+            if not references:
+                return method(*args, **kwargs)
+
+            other = {k: v for k, v in kwargs.items() if k != reference_argument}
+            key = cache.key(model_path, name, references, {"args": args[1:], **other})
+            value = cache.get(key, lambda: method(*args, **kwargs))
+            return SpeakerEmbeddingCache.to_device(value, getattr(model, "device", None))
+
+        return wrapper
+
+    @staticmethod
+    def to_device(value, device):
+        if device is None:
+            return value
+        if isinstance(value, (list, tuple)):
+            return type(value)(SpeakerEmbeddingCache.to_device(v, device) for v in value)
+        if hasattr(value, "to"):
+            return value.to(device)
+        return value
@@ -0,0 +1,40 @@
+
+import re
+
+import numpy as np
+
+# warm TTS model of a synthesis worker process, loaded once by the pool initializer
+_worker_tts = None
+
+def split_text(text, chunk_by="sentence"):
+    """Splits text in paragraphs (blank lines) or sentences (., ! or ? followed by a space), dropping empty chunks."""
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
+    if chunk_by == "paragraph":
+        return [" ".join(p.split()) for p in paragraphs]
+
+    sentences = []
+    for paragraph in paragraphs:
+        sentences.extend(s.strip() for s in re.split(r"(?<=[.!?])\s+", " ".join(paragraph.split())) if s.strip())
+    return sentences
+
+def synthesize(tts, seed, kwargs):
+    """
+    Synthesizes one chunk with a seeded RNG, so a chunk sounds the same whichever process renders it.
+    The seed is set on a forked RNG state, leaving the global one untouched; in-process callers hold the model's pool lock.
+    """
+    import torch
+
+    with torch.random.fork_rng():
+        torch.manual_seed(seed)
+        return np.asarray(tts.tts(**kwargs), dtype=np.float32)
+
+def init_worker(model_path, speaker_cache_dir=None):
+    from TTS.api import TTS
+    from core.frameworks.tts.speaker_cache import SpeakerEmbeddingCache
+
+    global _worker_tts
+    _worker_tts = TTS(model_path)
+    SpeakerEmbeddingCache(speaker_cache_dir).install(_worker_tts, model_path)
+
+def synthesize_in_worker(seed, kwargs):
+    return synthesize(_worker_tts, seed, kwargs)
@@ -1,41 +1,192 @@
 
 import json
+import multiprocessing
 import os
 
-from core.frameworks.tts        import TTSHandler
-from core.frameworks.sdp        import SDPHandler
-from core.frameworks.moviepy    import MoviePyHandler
-from core.utils                 import SimpleLogger, Utils
+from concurrent.futures         import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from core.frameworks.base       import BaseBuilder, BaseHandler
+from core.registry              import HandlerRegistry
+from core.scheduler             import ActionScheduler
+from core.utils                 import BuildManifest, SimpleLogger, Utils
+
+def _run_pipeline_in_process(manager_json, pipeline_path, log_file):
+    """Runs one pipeline in a worker process with its own log stream."""
+    name = os.path.splitext(os.path.basename(pipeline_path))[0]
+    SimpleLogger.reset(log_file=log_file, name=name)
+
+    manager = ProjectManager()
+    manager.configure(manager_json)
+    return manager.run_pipeline(pipeline_path)
 
 class ProjectManager:
     def __init__(self):
         self.logger = SimpleLogger.get_logger()
-        self.handlers = {
-            "tts"       : TTSHandler,
-            "sdp"       : SDPHandler,
-            "moviepy"   : MoviePyHandler
-        }
+        self.handlers = HandlerRegistry()
 
     def load_manager_json(self, filepath):
         f = Utils.load_text(filepath)
-        self.manager_json = json.loads(f)
+        self.configure(json.loads(f))
+
+    def configure(self, manager_json):
+        self.manager_json = manager_json
+
+        if self.manager_json.get("incremental-builds", False):
+            manifest_dir = self.manager_json.get("build-manifest-dir", ".build")
+            BaseHandler.manifest = BuildManifest(manifest_dir)
+            self.logger.info(f"🧾 Incremental builds enabled. Manifest: {BaseHandler.manifest.manifest_path}")
+
+        # memory budget of the named artifacts (audio-name, image-name, video-name), spilled to disk over it
+        # - 'persistent-cache-dir' keeps audio and images across runs
+        BaseBuilder.cache.configure(
+            memory_budget_mb=self.manager_json.get("cache-memory-budget-mb"),
+            spill_dir=self.manager_json.get("cache-spill-dir", ".cache/spill"),
+            persistent_dir=self.manager_json.get("persistent-cache-dir")
+        )
 
+    # Creates the action scheduler when parallel actions are enabled in manager.json:
+    # - 'parallel-actions' enables dependency-aware concurrent execution
+    # - 'max-action-workers' sets the worker pool size (defaults to the executor's choice)
+    # - 'action-worker-type' selects 'thread' or 'process' workers
+    def create_scheduler(self):
+        if not self.manager_json.get("parallel-actions", False):
+            return None
+
+        max_workers         = self.manager_json.get("max-action-workers", None)
+        worker_type         = self.manager_json.get("action-worker-type", "thread")
+
+        if worker_type not in ("thread", "process"):
+            self.logger.warning(f"⚠️ Unknown action worker type: {worker_type}. Using threads.")
+            worker_type = "thread"
+
+        return ActionScheduler(max_workers, worker_type)
+
+    # Runs the enabled pipelines and returns an exit status (0 when every pipeline succeeded):
+    # - pipelines wait for the pipelines listed in their 'depends-on' entry
+    # - 'max-parallel-pipelines' above 1 runs independent pipelines in separate processes
     def run(self):
         project_title = self.manager_json.get("project-title", "Unnamed Project")
         self.logger.info(f"📁 Starting project: {project_title}")
         
-        pipelines = self.manager_json.get("pipelines", [])
-        for pipeline in pipelines:
+        pipelines = []
+        for pipeline in self.manager_json.get("pipelines", []):
             if pipeline.get("enabled", True):
-                self.run_pipeline(pipeline['path'])
+                pipelines.append(pipeline)
             else:
                 self.logger.warning(f"❌ Skipping disabled pipeline: {pipeline['path']}")
 
+        dependencies = self.resolve_pipeline_dependencies(pipelines)
+        max_parallel = self.manager_json.get("max-parallel-pipelines", 1)
+
+        if max_parallel > 1:
+            results = self.run_pipelines_in_parallel(pipelines, dependencies, max_parallel)
+        else:
+            results = self.run_pipelines_in_order(pipelines, dependencies)
+
+        failed = [path for path, success in results.items() if not success]
+        if failed:
+            self.logger.error(f"❗ Failed pipelines: {', '.join(failed)}")
+            return 1
+
+        self.logger.info(f"🏁 Completed project: {project_title}")
+        return 0
+
+    # Resolves the 'depends-on' entries of the enabled pipelines:
+    # - dependencies on disabled or unknown pipelines are ignored
+    # - returns the set of dependency paths for each pipeline path
+    def resolve_pipeline_dependencies(self, pipelines):
+        paths = {pipeline["path"] for pipeline in pipelines}
+        dependencies = {}
+
+        for pipeline in pipelines:
+            dependencies[pipeline["path"]] = set()
+
+            for dependency in pipeline.get("depends-on", []):
+                if dependency in paths:
+                    dependencies[pipeline["path"]].add(dependency)
+                else:
+                    self.logger.warning(f"⚠️ Ignoring dependency of {pipeline['path']} on disabled or unknown pipeline: {dependency}")
+
+        return dependencies
+
+    # Returns the pipelines whose dependencies completed, and marks as failed
+    # the pipelines depending on a failed one
+    def ready_pipelines(self, pending, dependencies, results):
+        ready = []
+
+        for path in [p for p in pending if dependencies[p].issubset(results)]:
+            failed = [d for d in dependencies[path] if not results[d]]
+            pending.remove(path)
+
+            if failed:
+                self.logger.error(f"❗ Skipping pipeline {path}: dependency failed ({', '.join(failed)})")
+                results[path] = False
+            else:
+                ready.append(path)
+
+        return ready
+
+    def run_pipelines_in_order(self, pipelines, dependencies):
+        pending = [pipeline["path"] for pipeline in pipelines]
+        results = {}
+
+        while pending:
+            ready = self.ready_pipelines(pending, dependencies, results)
+            if not ready and pending:
+                self.logger.error(f"❗ Circular pipeline dependencies: {', '.join(pending)}")
+                results.update({path: False for path in pending})
+                break
+
+            for path in ready:
+                results[path] = self.run_pipeline(path)
+
+        return results
+
+    def run_pipelines_in_parallel(self, pipelines, dependencies, max_parallel):
+        pending = [pipeline["path"] for pipeline in pipelines]
+        results = {}
+        running = {}
+
+        self.logger.info(f"🔀 Running pipelines on up to {max_parallel} worker processes")
+
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max_parallel, mp_context=context) as executor:
+            while pending or running:
+                for path in self.ready_pipelines(pending, dependencies, results):
+                    log_file = self.pipeline_log_file(path)
+                    self.logger.info(f"➡️ Starting pipeline {path} (log: {log_file})")
+                    running[executor.submit(_run_pipeline_in_process, self.manager_json, path, log_file)] = path
+
+                if not running:
+                    if pending:
+                        self.logger.error(f"❗ Circular pipeline dependencies: {', '.join(pending)}")
+                        results.update({path: False for path in pending})
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = running.pop(future)
+                    try:
+                        results[path] = future.result()
+                    except Exception as e:
+                        self.logger.error(f"❗ Pipeline {path} crashed: {e}")
+                        results[path] = False
+
+                    self.logger.info(f"{'✅' if results[path] else '❗'} Finished pipeline {path}")
+
+        return results
+
+    def pipeline_log_file(self, pipeline_path):
+        name = os.path.splitext(os.path.basename(pipeline_path))[0]
+        return f"{os.path.splitext(self.logger.log_file_path)[0]}_{name}.log"
+
+    # Runs one pipeline and returns whether it completed without errors
     def run_pipeline(self, pipeline_path):
+        errors = self.logger.error_count
+
         self.logger.debug(f"🛠️  Loading subproject: {pipeline_path}")
         if not os.path.exists(pipeline_path):
             self.logger.error(f"❗ Cannot find pipeline file: {pipeline_path}")
-            return
+            return False
 
         f = Utils.load_text(pipeline_path)
         pipeline_json = json.loads(f)
@@ -57,8 +208,14 @@ class ProjectManager:
 
             try:
                 handler = handler_class()
-                handler.run(activity)
+                handler.run(activity, self.create_scheduler())
                 self.logger.info(f"✅ Completed activity: {step_name}")
 
             except Exception as e:
                 self.logger.error(f"❗ Error in activity {step_name}: {e}")
+
+        # complete the files still written in the background
+        BaseBuilder.writer.flush()
+        BaseBuilder.cache.log_stats()
+
+        return self.logger.error_count == errors
@@ -0,0 +1,71 @@
+
+import importlib
+
+from importlib.metadata     import entry_points
+from core.utils             import SimpleLogger
+
+class HandlerRegistry:
+    """
+    Maps activity types to handler classes.
+    Framework modules are imported only when an activity of their type is first scheduled.
+    Third-party handlers can be registered under the 'multimedia_builder.handlers' entry point group.
+    """
+
+    ENTRY_POINT_GROUP = "multimedia_builder.handlers"
+
+    BUILTIN_HANDLERS = {
+        "tts"       : "core.frameworks.tts:TTSHandler",
+        "sdp"       : "core.frameworks.sdp:SDPHandler",
+        "moviepy"   : "core.frameworks.moviepy:MoviePyHandler"
+    }
+
+    def __init__(self):
+        self.logger     = SimpleLogger.get_logger()
+        self.targets    = dict(HandlerRegistry.BUILTIN_HANDLERS)
+        self.handlers   = {}
+
+        self.load_entry_points()
+
+    # Registers a handler for an activity type:
+    # - target is a handler class, or a 'module:Class' string imported on first use
+    def register(self, type_, target):
+        self.targets[type_] = target
+        self.handlers.pop(type_, None)
+
+    def load_entry_points(self):
+        try:
+            for entry_point in entry_points(group=HandlerRegistry.ENTRY_POINT_GROUP):
+                if entry_point.name in self.targets:
+                    self.logger.warning(f"[HandlerRegistry] Entry point '{entry_point.value}' overrides handler type: {entry_point.name}")
+
+                self.register(entry_point.name, entry_point)
+        except Exception as e:
+            self.logger.error(f"[HandlerRegistry] Error while loading handler entry points: {e}")
+
+    def get(self, type_):
+        """Returns the handler class for an activity type, importing its framework on first use."""
+        if type_ in self.handlers:
+            return self.handlers[type_]
+
+        target = self.targets.get(type_)
+        if target is None:
+            return None
+
+        try:
+            if isinstance(target, str):
+                module_name, class_name = target.split(":")
+                handler_class = getattr(importlib.import_module(module_name), class_name)
+            elif hasattr(target, "load"):
+                handler_class = target.load()
+            else:
+                handler_class = target
+        except Exception as e:
+            self.logger.error(f"[HandlerRegistry] Error while loading handler for type '{type_}': {e}")
+            return None
+
+        self.logger.debug(f"[HandlerRegistry] Loaded handler for type '{type_}': {handler_class.__name__}")
+        self.handlers[type_] = handler_class
+        return handler_class
+
+    def types(self):
+        return sorted(self.targets)
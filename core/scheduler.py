@@ -0,0 +1,143 @@
+
+from concurrent.futures     import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from core.frameworks.base   import BaseBuilder, BaseHandler
+from core.utils             import ActionIO, SimpleLogger
+
+def _run_action_in_process(handler_class, defaults, action, cache_entries):
+    """Runs one action in a worker process and returns the cache entries it produced and whether it succeeded."""
+    # the build manifest is owned by the parent process
+    BaseHandler.manifest = None
+    BaseBuilder.cache.update(cache_entries)
+
+    handler = handler_class()
+    handler.defaults = defaults
+    handler.load_defaults(defaults)
+
+    errors = handler.logger.error_count
+    handler.handle(action)
+    BaseBuilder.writer.flush()
+
+    entries = {name: BaseBuilder.cache[name] for name in ActionIO.cache_names(action) if name in BaseBuilder.cache}
+    return entries, handler.logger.error_count == errors
+
+class ActionScheduler:
+    """Runs the actions of an activity concurrently, following the dependencies between them."""
+
+    def __init__(self, max_workers=None, worker_type="thread"):
+        self.logger         = SimpleLogger.get_logger()
+        self.max_workers    = max_workers
+        self.worker_type    = worker_type
+        self.fingerprints   = {}
+
+    @staticmethod
+    def build_graph(actions):
+        """
+        Builds the dependency graph of the given actions:
+        - an action depends on the last action writing any resource it reads (read after write)
+        - an action writing a resource depends on the previous readers and writer of it
+        Returns a list with the set of dependencies (indexes) for each action.
+        """
+        dependencies    = [set() for _ in actions]
+        last_writer     = {}
+        readers         = {}
+
+        for idx, action in enumerate(actions):
+            reads   = ActionIO.reads(action)
+            writes  = ActionIO.writes(action)
+
+            for resource in reads | writes:
+                if resource in last_writer:
+                    dependencies[idx].add(last_writer[resource])
+
+            for resource in writes:
+                dependencies[idx].update(readers.get(resource, ()))
+
+            for resource in reads:
+                readers.setdefault(resource, set()).add(idx)
+
+            for resource in writes:
+                last_writer[resource] = idx
+                readers[resource] = set()
+
+            dependencies[idx].discard(idx)
+
+        return dependencies
+
+    def run(self, handler, actions):
+        for action in actions:
+            if not action.get("enabled", True):
+                handler.handle(action)
+
+        actions         = [action for action in actions if action.get("enabled", True)]
+        dependencies    = self.build_graph(actions)
+        pending         = set(range(len(actions)))
+        running         = {}
+
+        self.logger.debug(f"[ActionScheduler] Scheduling {len(actions)} actions on {self.max_workers or 'default'} {self.worker_type} workers")
+
+        executor_class = ProcessPoolExecutor if self.worker_type == "process" else ThreadPoolExecutor
+        with executor_class(max_workers=self.max_workers) as executor, ThreadPoolExecutor(max_workers=self.max_workers) as threads:
+            while pending or running:
+                ready = [idx for idx in sorted(pending) if not (dependencies[idx] & (pending | set(running.values())))]
+
+                for idx in ready:
+                    pending.discard(idx)
+                    if self.worker_type == "process" and self.uses_clips(actions[idx]):
+                        self.logger.debug(f"[ActionScheduler] Running {actions[idx].get('command')} in a thread: video clips cannot leave this process")
+                        running[threads.submit(handler.handle, actions[idx])] = idx
+                    else:
+                        running[self.submit(executor, handler, actions[idx])] = idx
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx = running.pop(future)
+                    self.complete(future, handler, actions[idx])
+
+    @staticmethod
+    def uses_clips(action):
+        """Checks whether an action reads or writes video cache entries: clips hold open readers and cannot be pickled to a process."""
+        return any(resource.startswith("cache:video-") for resource in ActionIO.reads(action) | ActionIO.writes(action))
+
+    # Submits an action to the worker pool:
+    # - threads run the handler directly (including incremental build checks)
+    # - processes receive the cache entries the action reads; up-to-date checks stay in this process
+    def submit(self, executor, handler, action):
+        if self.worker_type != "process":
+            return executor.submit(handler.handle, action)
+
+        BaseBuilder.writer.wait(ActionIO.input_paths(action))
+
+        fingerprint = handler.fingerprint(action) if action.get("command") in handler.commands else None
+        if fingerprint and handler.restore(action, fingerprint):
+            self.logger.info(f"[ActionScheduler] Skipping up-to-date command: {action.get('command')}")
+            future = Future()
+            future.set_result(({}, True))
+            return future
+
+        reads = {resource[len("cache:"):] for resource in ActionIO.reads(action) if resource.startswith("cache:")}
+        cache_entries = {name: BaseBuilder.cache[name] for name in reads if name in BaseBuilder.cache}
+
+        state = handler.output_state(action) if fingerprint else None
+
+        future = executor.submit(_run_action_in_process, handler.__class__, handler.defaults, action, cache_entries)
+        self.fingerprints[future] = (fingerprint, state)
+        return future
+
+    def complete(self, future, handler, action):
+        command             = action.get("command")
+        fingerprint, state  = self.fingerprints.pop(future, (None, None))
+
+        try:
+            # thread workers return nothing, process workers return (cache entries, succeeded)
+            result = future.result()
+            if result is None:
+                return
+
+            cache_entries, succeeded = result
+            if cache_entries:
+                BaseBuilder.cache.update(cache_entries)
+
+            if fingerprint and succeeded:
+                handler.record(action, fingerprint, state)
+        except Exception as e:
+            self.logger.error(f"[ActionScheduler] Error in action {command}: {e}")
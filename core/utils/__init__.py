@@ -1,8 +1,18 @@
 
+from .action_io import ActionIO
+from .artifact_store import ArtifactStore
+from .async_writer import AsyncWriter
 from .logger import SimpleLogger
+from .manifest import BuildManifest
+from .model_pool import ModelPool
 from .utils import Utils
 
 __all__ = [
+    "ActionIO",
+    "ArtifactStore",
+    "AsyncWriter",
+    "BuildManifest",
+    "ModelPool",
     "SimpleLogger",
     "Utils"
 ]
@@ -0,0 +1,126 @@
+
+import os
+
+class ActionIO:
+    """Describes which files and cache entries an action reads and writes."""
+
+    # cache keys shared between actions (read and written by the same action)
+    NAME_KEYS = {
+        "audio-name"        : "audio",
+        "image-name"        : "image",
+        "video-name"        : "video"
+    }
+
+    # cache keys that are only read by an action
+    READ_NAME_KEYS = {
+        "audio-names"       : "audio",
+        "image-names"       : "image",
+        "video-names"       : "video",
+        "image-to-insert"   : "image",
+        "seed-image-name"   : "image"
+    }
+
+    # input files whose key does not follow the '*-path' naming
+    INPUT_KEYS = {"path-to-image"}
+
+    @staticmethod
+    def _as_list(value):
+        if value is None:
+            return []
+        if isinstance(value, (list, tuple)):
+            return list(value)
+        return [value]
+
+    @staticmethod
+    def _path_key(path):
+        return f"file:{os.path.normpath(path)}"
+
+    @staticmethod
+    def is_output_key(key):
+        return key.startswith("output-") and key.endswith("-path")
+
+    @staticmethod
+    def is_input_key(key):
+        if key in ActionIO.INPUT_KEYS:
+            return True
+        return (key.endswith("-path") or key.endswith("-paths")) and not key.startswith("output-")
+
+    @staticmethod
+    def input_paths(action):
+        """Returns the files read by an action (every '*-path'/'*-paths' key except outputs)."""
+        paths = []
+        for sub_action in ActionIO.sub_actions(action):
+            for key, value in sub_action.items():
+                if ActionIO.is_input_key(key):
+                    paths.extend(p for p in ActionIO._as_list(value) if isinstance(p, str))
+        return paths
+
+    # Returns the files written for a declared output path, as (paths, required):
+    # - split-audio writes '<path>_partN.wav', one per split time plus the last part;
+    #   only the first part is certain, out-of-range split times are dropped
+    # - '{seed}'/'{index}' templates (image-variations) are expanded over explicit 'seeds' or 'seed-range';
+    #   with random seeds the template is kept and matched against existing files
+    # - the first 'required' paths are always written by a successful action
+    @staticmethod
+    def expand_output(action, path):
+        if action.get("command") == "split-audio":
+            count = len(action.get("split-times", [])) + 1
+            return [f"{path}_part{idx}.wav" for idx in range(1, count + 1)], 1
+
+        seeds = action.get("seeds") or (list(range(*action["seed-range"])) if action.get("seed-range") else None)
+        if "{" in path and seeds:
+            try:
+                paths = [path.format(seed=seed, index=idx) for idx, seed in enumerate(seeds)]
+                return paths, len(paths)
+            except (KeyError, IndexError, ValueError):
+                pass
+
+        return [path], 1
+
+    @staticmethod
+    def output_groups(action):
+        """Returns the expanded output files of an action ('output-*-path' keys), one (paths, required) per declared path."""
+        groups = []
+        for sub_action in ActionIO.sub_actions(action):
+            for key, value in sub_action.items():
+                if ActionIO.is_output_key(key):
+                    groups.extend(ActionIO.expand_output(sub_action, p) for p in ActionIO._as_list(value) if isinstance(p, str))
+        return groups
+
+    @staticmethod
+    def output_paths(action):
+        """Returns the files written by an action."""
+        return [path for paths, _ in ActionIO.output_groups(action) for path in paths]
+
+    @staticmethod
+    def cache_names(action):
+        """Returns the cache entries (as '<type>-<name>') an action may write."""
+        names = []
+        for sub_action in ActionIO.sub_actions(action):
+            for key, data_type in ActionIO.NAME_KEYS.items():
+                for name in ActionIO._as_list(sub_action.get(key)):
+                    names.append(f"{data_type}-{name}")
+        return names
+
+    @staticmethod
+    def reads(action):
+        """Returns the resources an action depends on."""
+        resources = {ActionIO._path_key(p) for p in ActionIO.input_paths(action)}
+
+        for sub_action in ActionIO.sub_actions(action):
+            for key, data_type in {**ActionIO.NAME_KEYS, **ActionIO.READ_NAME_KEYS}.items():
+                for name in ActionIO._as_list(sub_action.get(key)):
+                    resources.add(f"cache:{data_type}-{name}")
+        return resources
+
+    @staticmethod
+    def writes(action):
+        """Returns the resources an action produces."""
+        resources = {ActionIO._path_key(p) for p in ActionIO.output_paths(action)}
+        resources.update(f"cache:{name}" for name in ActionIO.cache_names(action))
+        return resources
+
+    @staticmethod
+    def sub_actions(action):
+        """Returns the actions grouped in a composite action (e.g. a batch), or the action itself."""
+        return action.get("actions") or [action]
@@ -0,0 +1,329 @@
+
+import atexit
+import hashlib
+import os
+import pickle
+import shutil
+import sys
+import threading
+
+from collections            import OrderedDict
+from collections.abc        import MutableMapping
+from .logger                import SimpleLogger
+from .persistent_store      import PersistentArtifactStore
+
+class ArtifactStore(MutableMapping):
+    """
+    Named artifacts shared by the builders ('audio-<name>', 'image-<name>', 'video-<name>').
+    Behaves like a dict; with a memory budget, least recently used entries are spilled to disk
+    (audio as raw PCM, images as PNG) and reloaded transparently on access.
+    Clips (objects backed by open readers, e.g. moviepy clips) are pinned in memory; their reader buffers count
+    towards the budget, and a warning is logged when pinned clips alone keep the store over it.
+    With a persistent store, audio and images are also written to it and later runs load them from it.
+    """
+
+    def __init__(self, memory_budget_mb=None, spill_dir=".cache/spill"):
+        self.memory_budget_mb   = memory_budget_mb
+        self.spill_root         = spill_dir
+        self.entries            = OrderedDict()
+        self.spilled            = {}
+        self.stats              = {"hits": 0, "misses": 0, "spills": 0, "reloads": 0, "restored": 0}
+        self.persistent         = None
+        # names whose current value is in the persistent store (spilling them needs no write)
+        self.persisted          = set()
+        self._lock              = threading.RLock()
+        self._spill_dir         = None
+        self._over_budget       = False
+
+    @property
+    def logger(self):
+        # resolved on each use: the shared store is created at import, before pipeline worker processes reset the logger
+        return SimpleLogger.get_logger()
+
+    def configure(self, memory_budget_mb=None, spill_dir=None, persistent_dir=None):
+        with self._lock:
+            self.memory_budget_mb = memory_budget_mb
+            if spill_dir and spill_dir != self.spill_root:
+                self.spill_root = spill_dir
+                self._spill_dir = None
+
+            if persistent_dir is None:
+                self.persistent = None
+            elif self.persistent is None or self.persistent.store_dir != persistent_dir:
+                self.persistent = PersistentArtifactStore(persistent_dir)
+            self.persisted.clear()
+
+            self.evict_over_budget()
+
+    def spill_dir(self):
+        """Returns this process' spill directory, removed when the process exits."""
+        if self._spill_dir is None:
+            self._spill_dir = os.path.join(self.spill_root, str(os.getpid()))
+            os.makedirs(self._spill_dir, exist_ok=True)
+            atexit.register(shutil.rmtree, self._spill_dir, True)
+        return self._spill_dir
+
+    def __contains__(self, name):
+        with self._lock:
+            if name in self.entries or name in self.spilled:
+                return True
+            return self.persistent is not None and name in self.persistent
+
+    def __len__(self):
+        with self._lock:
+            return len(self.entries) + len(self.spilled)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self.entries) + list(self.spilled))
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name in self.entries:
+                self.entries.move_to_end(name)
+                self.stats["hits"] += 1
+                return self.entries[name][0]
+
+            if name in self.spilled:
+                value = self.reload(name)
+                self.stats["reloads"] += 1
+            else:
+                value = self.restore(name)
+                if value is None:
+                    self.stats["misses"] += 1
+                    raise KeyError(name)
+                self.stats["restored"] += 1
+            self.entries[name] = (value, ArtifactStore.estimate_size(value))
+            self.evict_over_budget(keep=name)
+            return value
+
+    def __setitem__(self, name, value):
+        with self._lock:
+            self.discard_spilled(name)
+            self.entries[name] = (value, ArtifactStore.estimate_size(value))
+            self.entries.move_to_end(name)
+            self.persist(name, value)
+            self.evict_over_budget(keep=name)
+
+    def __delitem__(self, name):
+        with self._lock:
+            if name not in self:
+                raise KeyError(name)
+            self.entries.pop(name, None)
+            self.discard_spilled(name)
+
+    def memory_mb(self):
+        with self._lock:
+            return sum(size for _, size in self.entries.values()) / (1 << 20)
+
+    # Spills least recently used entries until the resident entries fit in the budget:
+    # - pinned entries (clips) and the entry being accessed are never spilled
+    # - warns once when the store stays over the budget, until it fits again
+    def evict_over_budget(self, keep=None):
+        with self._lock:
+            if self.memory_budget_mb is None:
+                return
+
+            for name in list(self.entries):
+                if self.memory_mb() <= self.memory_budget_mb:
+                    break
+
+                value, size = self.entries[name]
+                if name == keep or ArtifactStore.is_clip(value):
+                    continue
+
+                try:
+                    self.spill(name, value)
+                except Exception as e:
+                    self.logger.warning(f"[ArtifactStore] Cannot spill '{name}', keeping it in memory: {e}")
+                    continue
+
+                del self.entries[name]
+                self.stats["spills"] += 1
+                self.logger.debug(f"[ArtifactStore] Spilled '{name}' ({size / (1 << 20):.1f} MB)")
+
+            over_budget = self.memory_mb() > self.memory_budget_mb
+            if over_budget and not self._over_budget:
+                pinned = sum(size for value, size in self.entries.values() if ArtifactStore.is_clip(value)) / (1 << 20)
+                self.logger.warning(
+                    f"[ArtifactStore] {self.memory_mb():.1f} MB resident over the {self.memory_budget_mb} MB budget, "
+                    f"of which {pinned:.1f} MB are pinned clips"
+                )
+            self._over_budget = over_budget
+
+    def spill_path(self, name, extension):
+        digest = hashlib.sha256(name.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.spill_dir(), f"{digest}.{extension}")
+
+    def spill(self, name, value):
+        if name in self.persisted:
+            # reloaded from the persistent store
+            self.spilled[name] = None
+            return
+
+        if ArtifactStore.is_audio(value):
+            import numpy as np
+
+            path = self.spill_path(name, "npz")
+            np.savez(
+                path,
+                data=np.frombuffer(value.raw_data, dtype=np.uint8),
+                params=np.array([value.frame_rate, value.channels, value.sample_width])
+            )
+        elif ArtifactStore.is_image(value) and value.mode in ("1", "L", "LA", "I", "P", "RGB", "RGBA"):
+            path = self.spill_path(name, "png")
+            value.save(path, format="PNG")
+        else:
+            path = self.spill_path(name, "pkl")
+            with open(path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self.spilled[name] = path
+
+    def reload(self, name):
+        path = self.spilled.pop(name)
+        if path is None:
+            return self.restore(name)
+
+        try:
+            if path.endswith(".npz"):
+                import numpy as np
+                from pydub import AudioSegment
+
+                with np.load(path) as data:
+                    frame_rate, channels, sample_width = (int(v) for v in data["params"])
+                    return AudioSegment(
+                        data["data"].tobytes(),
+                        frame_rate=frame_rate,
+                        channels=channels,
+                        sample_width=sample_width
+                    )
+
+            if path.endswith(".png"):
+                from PIL import Image
+
+                with Image.open(path) as image:
+                    image.load()
+                    return image
+
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        finally:
+            os.remove(path)
+
+    def discard_spilled(self, name):
+        path = self.spilled.pop(name, None)
+        if path and os.path.isfile(path):
+            os.remove(path)
+
+    # Writes audio (raw PCM) and images (raw pixels in their own mode, with the palette of P/PA images)
+    # to the persistent store, when enabled
+    def persist(self, name, value):
+        self.persisted.discard(name)
+        if self.persistent is None:
+            return
+
+        try:
+            if ArtifactStore.is_audio(value):
+                params = {"frame_rate": value.frame_rate, "channels": value.channels, "sample_width": value.sample_width}
+                self.persistent.put(name, "audio", params, value.raw_data)
+            elif ArtifactStore.is_image(value):
+                params = {"width": value.width, "height": value.height, "mode": value.mode, "raw": value.mode}
+                if value.mode in ("P", "PA"):
+                    params["palette"] = value.getpalette(value.palette.mode)
+                    params["palette_mode"] = value.palette.mode
+                    if isinstance(value.info.get("transparency"), int):
+                        params["transparency"] = value.info["transparency"]
+                self.persistent.put(name, "image", params, value.tobytes())
+            else:
+                return
+        except Exception as e:
+            self.logger.warning(f"[ArtifactStore] Cannot persist '{name}': {e}")
+            return
+
+        self.persisted.add(name)
+
+    # Loads an entry from the persistent store:
+    # - images are built over the memory-mapped pixels, in the mode they were stored in
+    #   (entries written as RGBA for another mode are converted back)
+    # - returns None when the store has no valid entry
+    def restore(self, name):
+        if self.persistent is None or name not in self.persistent:
+            return None
+
+        stored = self.persistent.open(name)
+        if stored is None:
+            return None
+
+        kind, params, buffer = stored
+        if kind == "audio":
+            from pydub import AudioSegment
+
+            value = AudioSegment(
+                bytes(buffer),
+                frame_rate=params["frame_rate"],
+                channels=params["channels"],
+                sample_width=params["sample_width"]
+            )
+        else:
+            from PIL import Image
+
+            raw = params.get("raw", "RGBA")
+            value = Image.frombuffer(raw, (params["width"], params["height"]), buffer, "raw", raw, 0, 1)
+            if "palette" in params:
+                value.putpalette(params["palette"], params["palette_mode"])
+                if "transparency" in params:
+                    value.info["transparency"] = params["transparency"]
+            if params["mode"] != raw:
+                value = value.convert(params["mode"])
+
+        self.persisted.add(name)
+        self.logger.debug(f"[ArtifactStore] Restored '{name}' from {self.persistent.store_dir}")
+        return value
+
+    def log_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            resident = len(self.entries)
+            spilled = len(self.spilled)
+
+        self.logger.info(
+            f"[ArtifactStore] hits={stats['hits']}, misses={stats['misses']}, spills={stats['spills']}, "
+            f"reloads={stats['reloads']}, restored={stats['restored']}, resident={resident} ({self.memory_mb():.1f} MB), spilled={spilled}"
+        )
+
+    @staticmethod
+    def is_audio(value):
+        return type(value).__name__ == "AudioSegment" and hasattr(value, "raw_data")
+
+    @staticmethod
+    def is_image(value):
+        image_module = sys.modules.get("PIL.Image")
+        return image_module is not None and isinstance(value, image_module.Image)
+
+    @staticmethod
+    def is_clip(value):
+        return hasattr(value, "get_frame") and hasattr(value, "duration")
+
+    @staticmethod
+    def estimate_size(value):
+        """Returns the estimated memory of an artifact in bytes."""
+        if ArtifactStore.is_audio(value):
+            return len(value.raw_data)
+        if ArtifactStore.is_image(value):
+            return value.width * value.height * len(value.getbands())
+        if ArtifactStore.is_clip(value):
+            return ArtifactStore.estimate_clip_size(value)
+        return sys.getsizeof(value)
+
+    @staticmethod
+    def estimate_clip_size(clip):
+        """Estimates the buffers of a clip's readers: its last decoded RGB frame and its audio samples buffer."""
+        size = 0
+        if getattr(clip, "size", None):
+            width, height = clip.size
+            size += width * height * 3
+
+        for reader in (getattr(clip, "reader", None), getattr(getattr(clip, "audio", None), "reader", None)):
+            size += getattr(getattr(reader, "buffer", None), "nbytes", 0)
+        return size
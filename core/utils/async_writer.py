@@ -0,0 +1,93 @@
+
+import os
+import threading
+import weakref
+
+from concurrent.futures     import ThreadPoolExecutor, wait
+from .logger                import SimpleLogger
+
+# writers of this process, reset in forked children (see AsyncWriter.after_fork)
+_writers = weakref.WeakSet()
+
+class AsyncWriter:
+    """
+    Writes output files in background threads, so the next action can start while a file is written.
+    Readers wait for the pending writes of the paths they use; writes to the same path run in order.
+    """
+
+    def __init__(self, max_workers=2):
+        self.max_workers    = max_workers
+        self.pending        = {}
+        self._executor      = None
+        self._lock          = threading.Lock()
+        _writers.add(self)
+
+    @property
+    def logger(self):
+        return SimpleLogger.get_logger()
+
+    @staticmethod
+    def normalize(path):
+        return os.path.normpath(os.path.abspath(path))
+
+    # Schedules write(*args) for the given path:
+    # - a previous pending write of the same path completes first
+    # - errors are logged when the write completes
+    def submit(self, path, write, *args):
+        key = AsyncWriter.normalize(path)
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="writer")
+            previous = self.pending.get(key)
+
+            def run():
+                if previous is not None:
+                    wait([previous])
+                try:
+                    write(*args)
+                except Exception as e:
+                    self.logger.error(f"[AsyncWriter] Error while writing {path}: {e}")
+
+            future = self._executor.submit(run)
+            self.pending[key] = future
+
+        future.add_done_callback(lambda f: self.done(key, f))
+        return future
+
+    def done(self, key, future):
+        with self._lock:
+            if self.pending.get(key) is future:
+                del self.pending[key]
+
+    # Waits for the pending writes of the given paths (every pending write when paths is None)
+    def wait(self, paths=None):
+        with self._lock:
+            if paths is None:
+                futures = list(self.pending.values())
+            else:
+                futures = [self.pending[key] for key in map(AsyncWriter.normalize, paths) if key in self.pending]
+
+        if futures:
+            wait(futures)
+
+    def flush(self):
+        self.wait()
+
+    # Resets a writer in a forked child process:
+    # - the executor threads of the parent do not exist in the child, so its pending futures never complete
+    #   and flush would hang; the child starts with no pending writes and creates its own executor on submit
+    # - the parent's writes are still completed by the parent (schedulers wait for the input paths of an action
+    #   before handing it to a worker)
+    # - the lock is recreated, as another thread may have held it when the process forked
+    def after_fork(self):
+        self.pending        = {}
+        self._executor      = None
+        self._lock          = threading.Lock()
+
+def _after_fork_in_child():
+    for writer in list(_writers):
+        writer.after_fork()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -1,5 +1,6 @@
 
 import os
+import threading
 
 from datetime import datetime
 from colorama import Fore, Style, init as colorama_init
@@ -7,21 +8,26 @@ from colorama import Fore, Style, init as colorama_init
 class SimpleLogger:
     _instance = None
 
-    def __new__(cls, log_dir="logs", log_file=None):
+    def __new__(cls, log_dir="logs", log_file=None, name=None):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            cls._instance._init_logger(log_dir, log_file)
+            cls._instance._init_logger(log_dir, log_file, name)
         return cls._instance
 
-    def _init_logger(self, log_dir, log_file):
+    def _init_logger(self, log_dir, log_file, name):
         colorama_init(autoreset=True)
         os.makedirs(log_dir, exist_ok=True)
+        if log_file:
+            os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
 
         if not log_file:
             now = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
             log_file = f"{log_dir}/run_{now}.log"
 
         self.log_file_path = log_file
+        self.name = name
+        self.error_count = 0
+        self._lock = threading.Lock()
         with open(self.log_file_path, 'a', encoding='utf-8') as f:
             f.write(f"[INFO] Logger initialized. Saving logs to {self.log_file_path}\n")
 
@@ -39,12 +45,16 @@ class SimpleLogger:
             "DEBUG": Fore.CYAN
         }
         color = color_map.get(level, Fore.WHITE)
-        print(f"{color}[{level}] {message}{Style.RESET_ALL}")
+        prefix = f"[{self.name}] " if self.name else ""
+        print(f"{color}{prefix}[{level}] {message}{Style.RESET_ALL}")
 
     def _log(self, message, level):
         timestamped = f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - [{level}] {message}"
-        self._log_to_console(message, level)
-        self._log_to_file(timestamped)
+        with self._lock:
+            if level == "ERROR":
+                self.error_count += 1
+            self._log_to_console(message, level)
+            self._log_to_file(timestamped)
 
     def info(self, message):
         self._log(message, "INFO")
@@ -62,3 +72,9 @@ class SimpleLogger:
     def get_logger(cls):
         return cls()
 
+    @classmethod
+    def reset(cls, log_file=None, name=None):
+        """Replaces the shared logger, e.g. to give a worker process its own log stream."""
+        cls._instance = None
+        return cls(log_file=log_file, name=name)
+
@@ -0,0 +1,254 @@
+
+import fcntl
+import glob
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+
+from .action_io         import ActionIO
+from .artifact_store    import ArtifactStore
+from .logger            import SimpleLogger
+from .utils             import Utils
+
+class BuildManifest:
+    """Persistent record of executed actions, used to skip actions whose inputs did not change."""
+
+    def __init__(self, manifest_dir=".build"):
+        self.logger         = SimpleLogger.get_logger()
+        self.manifest_path  = os.path.join(manifest_dir, "manifest.json")
+        self.entries_dir    = os.path.join(manifest_dir, "entries")
+        self.actions        = {}
+        self.files          = {}
+        self.recorded       = set()
+        # fingerprints of the actions that produced each cache entry during this run
+        self.entries        = {}
+        self._lock          = threading.RLock()
+
+        self.load()
+
+    def read(self):
+        if not os.path.isfile(self.manifest_path):
+            return {}
+
+        try:
+            return json.loads(Utils.load_text(self.manifest_path))
+        except Exception as e:
+            self.logger.warning(f"[BuildManifest] Ignoring unreadable manifest {self.manifest_path}: {e}")
+            return {}
+
+    def load(self):
+        data = self.read()
+        self.actions    = data.get("actions", {})
+        self.files      = data.get("files", {})
+
+    # Saves the manifest:
+    # - other processes (parallel pipelines) may share the same manifest, so the file
+    #   is re-read under a lock and only the actions recorded by this process are replaced
+    def save(self):
+        with self._lock:
+            Utils.ensure_dir(self.manifest_path)
+
+            with open(self.manifest_path + ".lock", "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+                data = self.read()
+                actions = data.get("actions", {})
+                actions.update({key: self.actions[key] for key in self.recorded})
+                files = {**data.get("files", {}), **self.files}
+
+                temp_path = self.manifest_path + ".tmp"
+                Utils.save_text(json.dumps({"actions": actions, "files": files}, indent=2, sort_keys=True), temp_path)
+                os.replace(temp_path, self.manifest_path)
+
+                self.actions    = actions
+                self.files      = files
+
+    # Hashes the content of a file:
+    # - reuses the previous digest when size and modification time are unchanged
+    # - returns None for missing files
+    def file_digest(self, path):
+        if not os.path.isfile(path):
+            return None
+
+        stat = os.stat(path)
+        with self._lock:
+            known = self.files.get(path)
+        if known and known["size"] == stat.st_size and known["mtime"] == stat.st_mtime_ns:
+            return known["digest"]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+
+        with self._lock:
+            self.files[path] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "digest": digest.hexdigest()}
+        return digest.hexdigest()
+
+    @staticmethod
+    def outputs_exist(action):
+        """Checks the output files an action always writes; templated paths left unexpanded (random seeds) need at least one match."""
+        for paths, required in ActionIO.output_groups(action):
+            for path in paths[:required]:
+                if "{" in path:
+                    if not glob.glob(re.sub(r"\{[^}]*\}", "*", glob.escape(path))):
+                        return False
+                elif not os.path.exists(path):
+                    return False
+        return True
+
+    @staticmethod
+    def matches(path):
+        """Returns the existing files of an output path (the files matching a templated path)."""
+        if "{" in path:
+            return glob.glob(re.sub(r"\{[^}]*\}", "*", glob.escape(path)))
+        return [path]
+
+    @staticmethod
+    def file_state(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+
+    def output_state(self, action):
+        """Returns the state (modification time, size, inode) of the output files before an action runs."""
+        return {match: self.file_state(match) for path in ActionIO.output_paths(action) for match in self.matches(path)}
+
+    # Returns the output files written since the given state:
+    # - None when a file the action always writes was not (re)written, e.g. a stale file left by an earlier run
+    def written_outputs(self, action, state):
+        written = []
+        for paths, required in ActionIO.output_groups(action):
+            for idx, path in enumerate(paths):
+                changed = [match for match in self.matches(path) if self.file_state(match) not in (None, state.get(match))]
+                if idx < required and not changed:
+                    return None
+                written.extend(changed)
+        return written
+
+    @staticmethod
+    def action_key(handler_name, action):
+        """Identifies an action across runs by its command and the outputs it produces."""
+        outputs = sorted(ActionIO.writes(action))
+        if not outputs:
+            return None
+
+        key = json.dumps([handler_name, action.get("command"), outputs])
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    # Computes the fingerprint of an action:
+    # - action parameters and handler defaults
+    # - contents of the referenced input files
+    # - fingerprints of the cache entries the action reads
+    def fingerprint(self, handler_name, action, defaults):
+        reads = sorted(ActionIO.reads(action))
+
+        with self._lock:
+            entries = {r: self.entries.get(r[len("cache:"):]) for r in reads if r.startswith("cache:")}
+
+        data = {
+            "handler"   : handler_name,
+            "action"    : action,
+            "defaults"  : defaults,
+            "files"     : {path: self.file_digest(path) for path in ActionIO.input_paths(action)},
+            "entries"   : entries
+        }
+        return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    # Restores an unchanged action:
+    # - the fingerprint must match the one recorded by the last run
+    # - all output files must still exist
+    # - the named cache entries are reloaded from disk into the given cache (clips are reopened from their video file)
+    def restore(self, handler_name, action, fingerprint, cache):
+        key = self.action_key(handler_name, action)
+
+        with self._lock:
+            record = self.actions.get(key) if key else None
+        if not record or record["fingerprint"] != fingerprint:
+            return False
+
+        if not self.outputs_exist(action) or not all(os.path.exists(path) for path in record.get("outputs", [])):
+            return False
+
+        try:
+            restored = {}
+            for name, entry_path in record["entries"].items():
+                if isinstance(entry_path, dict):
+                    restored[name] = self.load_clip(entry_path["clip"])
+                    continue
+
+                with open(entry_path, "rb") as f:
+                    restored[name] = pickle.load(f)
+        except Exception as e:
+            self.logger.warning(f"[BuildManifest] Cannot restore cache entries of {action.get('command')}: {e}")
+            return False
+
+        cache.update(restored)
+        with self._lock:
+            for name in restored:
+                self.entries[name] = fingerprint
+        return True
+
+    @staticmethod
+    def load_clip(path):
+        from moviepy import VideoFileClip
+
+        return VideoFileClip(path)
+
+    # Records a successful action:
+    # - skipped when an output file was not written or a named cache entry is missing
+    # - stores the written output files, all checked before restoring the action
+    # - stores the named cache entries on disk so a later run can restore them; clips are stored as the video file the action wrote
+    def record(self, handler_name, action, fingerprint, cache, state):
+        key = self.action_key(handler_name, action)
+        if not key:
+            return
+
+        # downstream actions must see the new fingerprint even if this run cannot be recorded
+        names = ActionIO.cache_names(action)
+        with self._lock:
+            for name in names:
+                self.entries[name] = fingerprint
+
+        outputs = self.written_outputs(action, state)
+        if outputs is None:
+            self.logger.debug(f"[BuildManifest] Not recording {action.get('command')}: outputs were not written")
+            return
+
+        if not all(name in cache for name in names):
+            return
+
+        try:
+            entries = {}
+            for name in names:
+                if ArtifactStore.is_clip(cache[name]):
+                    # clips hold open readers and cannot be pickled: they are reopened from the video the action wrote
+                    if len(outputs) != 1:
+                        self.logger.debug(f"[BuildManifest] Not recording {action.get('command')}: no single output file for clip '{name}'")
+                        return
+                    entries[name] = {"clip": outputs[0]}
+                    continue
+
+                entry_path = os.path.join(self.entries_dir, f"{fingerprint}-{name}.pkl")
+                Utils.ensure_dir(entry_path)
+                with open(entry_path, "wb") as f:
+                    pickle.dump(cache[name], f, protocol=pickle.HIGHEST_PROTOCOL)
+                entries[name] = entry_path
+        except Exception as e:
+            self.logger.warning(f"[BuildManifest] Cannot store cache entries of {action.get('command')}: {e}")
+            return
+
+        with self._lock:
+            previous = self.actions.get(key, {}).get("entries", {})
+            for name, entry_path in previous.items():
+                if isinstance(entry_path, str) and entry_path not in entries.values():
+                    Utils.delete_file(entry_path)
+
+            self.actions[key] = {"fingerprint": fingerprint, "entries": entries, "outputs": sorted(outputs)}
+            self.recorded.add(key)
+            self.save()
@@ -0,0 +1,153 @@
+
+import gc
+import sys
+import threading
+import time
+
+from collections    import OrderedDict
+from .logger        import SimpleLogger
+
+class ModelPool:
+    """
+    Process-wide pool of loaded models, shared across actions and activities.
+    Models are kept resident and evicted in least-recently-used order when the
+    number of models or their estimated memory exceeds the configured limits.
+    """
+
+    def __init__(self, name, max_entries=None, memory_budget_mb=None):
+        self.name               = name
+        self.max_entries        = max_entries
+        self.memory_budget_mb   = memory_budget_mb
+        self.entries            = OrderedDict()
+        self._lock              = threading.RLock()
+        self._loading           = {}
+        self._locks             = {}
+
+    @property
+    def logger(self):
+        return SimpleLogger.get_logger()
+
+    def configure(self, max_entries=None, memory_budget_mb=None):
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if memory_budget_mb is not None:
+                self.memory_budget_mb = memory_budget_mb
+            self.evict_over_limits()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self.entries
+
+    def keys(self):
+        with self._lock:
+            return list(self.entries)
+
+    # Returns the model stored under key:
+    # - loads it with the given loader on first use (only once, even with concurrent callers)
+    # - marks it as most recently used
+    def get(self, key, loader):
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key][0]
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    return self.entries[key][0]
+
+            # make room first, so the evicted model and the new one are not resident together
+            self.make_room()
+
+            try:
+                start = time.perf_counter()
+                model = loader()
+                size = ModelPool.estimate_size(model)
+                self.logger.info(f"[ModelPool][{self.name}] Loaded {key} in {time.perf_counter() - start:.2f}s (~{size / (1 << 20):.0f} MB)")
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+
+            with self._lock:
+                self.entries[key] = (model, size)
+                self.evict_over_limits(keep=key)
+
+        return model
+
+    # Returns the lock of the model stored under key:
+    # - a pooled model is shared by every thread, and calls into it (and the RNG seeded for them) are not thread-safe
+    # - callers hold it for the duration of one model call, so threads using other models still run concurrently
+    def lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def put(self, key, model):
+        with self._lock:
+            self.entries[key] = (model, ModelPool.estimate_size(model))
+            self.evict_over_limits(keep=key)
+
+    def memory_mb(self):
+        with self._lock:
+            return sum(size for _, size in self.entries.values()) / (1 << 20)
+
+    def make_room(self):
+        with self._lock:
+            while self.entries and self.max_entries is not None and len(self.entries) >= self.max_entries:
+                self.evict(next(iter(self.entries)))
+
+    def evict_over_limits(self, keep=None):
+        with self._lock:
+            while len(self.entries) > 1:
+                over_count  = self.max_entries is not None and len(self.entries) > self.max_entries
+                over_budget = self.memory_budget_mb is not None and self.memory_mb() > self.memory_budget_mb
+                if not (over_count or over_budget):
+                    break
+
+                oldest = next(iter(self.entries))
+                if oldest == keep:
+                    break
+                self.evict(oldest)
+
+    # Evicts one model, or every model when no key is given
+    def evict(self, key=None):
+        with self._lock:
+            keys = [key] if key is not None else list(self.entries)
+            for k in keys:
+                if self.entries.pop(k, None) is not None:
+                    self.logger.info(f"[ModelPool][{self.name}] Evicted {k}")
+
+        gc.collect()
+        if "torch" in sys.modules:
+            torch = sys.modules["torch"]
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+    @staticmethod
+    def estimate_size(model, seen=None):
+        """
+        Estimates the memory used by a model from its torch parameters and buffers (0 if unknown).
+        Dicts and lists of models are summed, counting tensors shared between models once.
+        """
+        seen = set() if seen is None else seen
+
+        if isinstance(model, dict):
+            return sum(ModelPool.estimate_size(m, seen) for m in model.values())
+        if isinstance(model, (list, tuple)):
+            return sum(ModelPool.estimate_size(m, seen) for m in model)
+
+        modules = []
+        if hasattr(model, "parameters") and callable(model.parameters):
+            modules.append(model)
+        elif hasattr(model, "components") and isinstance(model.components, dict):
+            modules.extend(c for c in model.components.values() if hasattr(c, "parameters"))
+
+        size = 0
+        for module in modules:
+            for tensor in list(module.parameters()) + list(module.buffers()):
+                if id(tensor) not in seen:
+                    seen.add(id(tensor))
+                    size += tensor.numel() * tensor.element_size()
+        return size
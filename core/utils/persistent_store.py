@@ -0,0 +1,155 @@
+
+import contextlib
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import threading
+
+from .logger    import SimpleLogger
+from .utils     import Utils
+
+class PersistentArtifactStore:
+    """
+    Cross-run store of named artifacts as raw data files (PCM samples, image pixels) listed in a
+    'manifest.json' with their kind, parameters, size and sha256. Entries are memory-mapped on load,
+    so a later run reads them back without decoding; corrupted entries are dropped.
+    The manifest and the data files are shared by processes: writers hold an exclusive lock, readers a shared one.
+    """
+
+    def __init__(self, store_dir, verify=True):
+        self.store_dir      = store_dir
+        self.manifest_path  = os.path.join(store_dir, "manifest.json")
+        self.verify         = verify
+        self.entries        = {}
+        # sha256 of the entries already verified by this process
+        self.verified       = {}
+        self._lock          = threading.RLock()
+
+        self.load()
+
+    @property
+    def logger(self):
+        return SimpleLogger.get_logger()
+
+    def read(self):
+        if not os.path.isfile(self.manifest_path):
+            return {}
+
+        try:
+            return json.loads(Utils.load_text(self.manifest_path))
+        except Exception as e:
+            self.logger.warning(f"[PersistentArtifactStore] Ignoring unreadable manifest {self.manifest_path}: {e}")
+            return {}
+
+    def load(self):
+        with self._lock:
+            self.entries = self.read()
+
+    def __contains__(self, name):
+        with self._lock:
+            if name not in self.entries:
+                # another process (e.g. a parallel pipeline) may have stored it since
+                self.load()
+            return name in self.entries
+
+    def data_path(self, name):
+        digest = hashlib.sha256(name.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.store_dir, f"{digest}.raw")
+
+    @contextlib.contextmanager
+    def locked(self, exclusive=True):
+        """Holds the lock of the store files, shared by the processes using the store."""
+        Utils.ensure_dir(self.manifest_path)
+
+        with open(self.manifest_path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    # Updates the manifest entry of a name (None removes it), with the exclusive lock held:
+    # - the manifest may be shared by several processes, so it is re-read and merged
+    def update(self, name, entry):
+        entries = self.read()
+        if entry is None:
+            entries.pop(name, None)
+        else:
+            entries[name] = entry
+
+        temp_path = self.manifest_path + ".tmp"
+        Utils.save_text(json.dumps(entries, indent=2, sort_keys=True), temp_path)
+        os.replace(temp_path, self.manifest_path)
+
+        with self._lock:
+            self.entries = entries
+
+    # Stores an entry:
+    # - the data file and its manifest entry are replaced together, so readers never see one without the other
+    def put(self, name, kind, params, data):
+        path = self.data_path(name)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        Utils.ensure_dir(path)
+        with open(temp_path, "wb") as f:
+            f.write(data)
+
+        entry = {
+            "kind"      : kind,
+            "params"    : params,
+            "file"      : os.path.basename(path),
+            "size"      : len(data),
+            "sha256"    : hashlib.sha256(data).hexdigest()
+        }
+
+        with self.locked():
+            os.replace(temp_path, path)
+            self.update(name, entry)
+
+        with self._lock:
+            self.verified[name] = entry["sha256"]
+
+    # Returns (kind, params, buffer) of a stored entry, or None when it is missing or corrupted:
+    # - the entry is re-read from the manifest, as another process may have replaced it
+    # - the buffer is a read-only memory map of the raw data
+    # - the sha256 of an entry is checked once per process
+    def open(self, name):
+        with self.locked(exclusive=False):
+            entry = self.read().get(name)
+            if entry is None:
+                return None
+
+            try:
+                stored = self.map(name, entry)
+            except (OSError, ValueError) as e:
+                error = e
+            else:
+                with self._lock:
+                    self.entries[name] = entry
+                return stored
+
+        with self.locked():
+            # drop the entry only if no other process replaced it meanwhile
+            if self.read().get(name) == entry:
+                self.logger.warning(f"[PersistentArtifactStore] Dropping corrupted entry '{name}': {error}")
+                self.update(name, None)
+        return None
+
+    def map(self, name, entry):
+        path = os.path.join(self.store_dir, entry["file"])
+        size = os.path.getsize(path)
+        if size != entry["size"]:
+            raise ValueError(f"size {size} instead of {entry['size']}")
+
+        if self.verify and self.verified.get(name) != entry["sha256"]:
+            digest = Utils.file_sha256(path)
+            if digest != entry["sha256"]:
+                raise ValueError("sha256 mismatch")
+            with self._lock:
+                self.verified[name] = entry["sha256"]
+
+        if size == 0:
+            return entry["kind"], entry["params"], b""
+
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return entry["kind"], entry["params"], buffer
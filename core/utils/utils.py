@@ -1,4 +1,5 @@
 
+import hashlib
 import os
 
 class Utils:
@@ -25,6 +26,15 @@ class Utils:
         with open(path, "w", encoding="utf-8") as f:
             f.write(text)
 
+    @staticmethod
+    def file_sha256(path):
+        """Return the sha256 hex digest of a file's content."""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
     @staticmethod
     def format_time(seconds):
         hours = int(seconds // 3600)
@@ -1,6 +1,18 @@
+import argparse
+import sys
+
 from core.manager import ProjectManager
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the pipelines enabled in a manager file.")
+    parser.add_argument("--manager", default="manager.json", help="path to the manager file")
+    parser.add_argument("--max-parallel-pipelines", type=int, default=None, help="number of pipelines run in parallel worker processes")
+    args = parser.parse_args()
+
     manager = ProjectManager()
-    manager.load_manager_json('manager.json')
-    manager.run()
+    manager.load_manager_json(args.manager)
+
+    if args.max_parallel_pipelines is not None:
+        manager.manager_json["max-parallel-pipelines"] = args.max_parallel_pipelines
+
+    sys.exit(manager.run())
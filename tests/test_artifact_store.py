@@ -0,0 +1,80 @@
+import tempfile
+import unittest
+
+from PIL                    import Image
+from core.utils             import ArtifactStore
+
+class FakeAudioReader:
+    def __init__(self, nbytes):
+        # a memoryview has nbytes, like the numpy buffer of a moviepy audio reader
+        self.buffer     = memoryview(bytearray(nbytes))
+
+class FakeAudio:
+    def __init__(self, nbytes):
+        self.reader     = FakeAudioReader(nbytes)
+
+class FakeClip:
+    """Stands in for a moviepy clip: a frame size and an audio reader buffer."""
+
+    def __init__(self, width, height, audio_nbytes=0):
+        self.duration   = 1.0
+        self.size       = (width, height)
+        self.audio      = FakeAudio(audio_nbytes)
+
+    def get_frame(self, t):
+        return None
+
+class ArtifactStoreClipTest(unittest.TestCase):
+    def test_clip_readers_count_towards_budget(self):
+        clip = FakeClip(640, 480, audio_nbytes=1 << 16)
+        self.assertEqual(ArtifactStore.estimate_size(clip), 640 * 480 * 3 + (1 << 16))
+
+    def test_clips_stay_pinned_over_budget(self):
+        spill_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(spill_dir.cleanup)
+
+        store = ArtifactStore(memory_budget_mb=1, spill_dir=spill_dir.name)
+        store["video-a"] = FakeClip(1280, 720)
+        store["image-b"] = b"x" * 1024
+        store["video-c"] = FakeClip(1280, 720)
+
+        self.assertIn("video-a", store.entries)
+        self.assertIn("video-c", store.entries)
+        self.assertGreater(store.memory_mb(), 1)
+
+class ArtifactStorePersistTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def round_trip(self, image):
+        store = ArtifactStore(spill_dir=self.directory.name)
+        store.configure(persistent_dir=self.directory.name)
+        store["image-a"] = image
+
+        # a later run: loaded from the persistent store
+        later = ArtifactStore(spill_dir=self.directory.name)
+        later.configure(persistent_dir=self.directory.name)
+        return later["image-a"]
+
+    def test_images_keep_their_mode_and_pixels(self):
+        gradient = Image.linear_gradient("L").resize((64, 32))
+        images = [
+            gradient.convert("RGB").quantize(colors=7),
+            gradient.point(lambda v: v * 250, "I").convert("I;16"),
+            gradient.point(lambda v: v * 70000, "I"),
+            gradient.convert("RGB").convert("CMYK"),
+            gradient.convert("RGB").convert("LAB"),
+            gradient.convert("RGBA")
+        ]
+
+        for image in images:
+            with self.subTest(mode=image.mode):
+                restored = self.round_trip(image)
+                self.assertEqual(restored.mode, image.mode)
+                self.assertEqual(restored.tobytes(), image.tobytes())
+                if image.mode == "P":
+                    self.assertEqual(restored.getpalette(), image.getpalette())
+
+if __name__ == "__main__":
+    unittest.main()
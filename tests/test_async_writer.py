@@ -0,0 +1,50 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import unittest
+
+from core.utils             import AsyncWriter
+
+def write_text(path, text, started=None, release=None):
+    if started is not None:
+        started.set()
+        release.wait()
+    with open(path, "w") as f:
+        f.write(text)
+
+def write_in_child(writer, path):
+    writer.submit(path, write_text, path, "child")
+    writer.flush()
+
+@unittest.skipUnless(hasattr(os, "fork"), "requires fork")
+class AsyncWriterForkTest(unittest.TestCase):
+    def test_forked_child_flushes_its_own_writes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            writer = AsyncWriter()
+            started, release = threading.Event(), threading.Event()
+
+            # a parent write still pending when the child is forked
+            writer.submit(os.path.join(directory, "parent.txt"), write_text, os.path.join(directory, "parent.txt"), "parent", started, release)
+            started.wait()
+
+            child_path = os.path.join(directory, "child.txt")
+            process = multiprocessing.get_context("fork").Process(target=write_in_child, args=(writer, child_path))
+            process.start()
+            process.join(timeout=10)
+
+            release.set()
+            writer.flush()
+
+            if process.is_alive():
+                process.kill()
+                self.fail("flush hung in the forked child")
+            self.assertEqual(process.exitcode, 0)
+
+            with open(child_path) as f:
+                self.assertEqual(f.read(), "child")
+            with open(os.path.join(directory, "parent.txt")) as f:
+                self.assertEqual(f.read(), "parent")
+
+if __name__ == "__main__":
+    unittest.main()
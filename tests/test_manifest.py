@@ -0,0 +1,72 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from unittest               import mock
+
+from core.frameworks.base   import BaseBuilder, BaseHandler
+from core.utils             import BuildManifest, SimpleLogger
+
+class FakeClip:
+    """Stands in for a moviepy clip: it can be rendered but not pickled (it holds a lock like an open reader)."""
+
+    def __init__(self, filename):
+        self.filename   = filename
+        self.duration   = 1.0
+        self.reader     = threading.Lock()
+
+    def get_frame(self, t):
+        return None
+
+class VideoHandler(BaseHandler):
+    def __init__(self):
+        super().__init__()
+        self.runs       = 0
+        self.commands   = {"generate-video": self.generate_video}
+
+    def generate_video(self, action):
+        self.runs += 1
+
+        with open(action["output-video-path"], "w") as f:
+            f.write("video")
+        BaseBuilder.cache[f"video-{action['video-name']}"] = FakeClip(action["output-video-path"])
+
+class BuildManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.previous_directory = os.getcwd()
+        os.chdir(self.directory.name)
+
+        SimpleLogger.reset(log_file=os.path.join(self.directory.name, "test.log"))
+        BaseHandler.manifest = BuildManifest(".build")
+        BaseBuilder.cache.clear()
+
+    def tearDown(self):
+        BaseHandler.manifest = None
+        BaseBuilder.cache.clear()
+
+        os.chdir(self.previous_directory)
+        self.directory.cleanup()
+
+    def test_second_run_skips_video_action(self):
+        action = {"command": "generate-video", "output-video-path": "video.mp4", "video-name": "clip"}
+
+        first = VideoHandler()
+        first.handle(action)
+        self.assertEqual(first.runs, 1)
+
+        # a new run: fresh manifest and empty cache
+        BaseHandler.manifest = BuildManifest(".build")
+        BaseBuilder.cache.clear()
+
+        with mock.patch.object(BuildManifest, "load_clip", side_effect=FakeClip) as load_clip:
+            second = VideoHandler()
+            second.handle(action)
+
+        self.assertEqual(second.runs, 0)
+        load_clip.assert_called_once_with("video.mp4")
+        self.assertEqual(BaseBuilder.cache["video-clip"].filename, "video.mp4")
+
+if __name__ == "__main__":
+    unittest.main()